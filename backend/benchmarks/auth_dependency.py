@@ -0,0 +1,124 @@
+"""
+The require_role dependency chain (bearer header -> decode_token ->
+get_current_user -> role check) with and without the verified-token
+cache, under concurrent requests.
+
+    cd backend
+    python -m benchmarks.auth_dependency --requests 20000 --concurrency 50 --users 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.security import HTTPAuthorizationCredentials
+
+from core import security
+from core.database import get_db
+
+
+class _Users:
+    # Stands in for db.users so only the auth chain is measured
+    def __init__(self, users):
+        self._users = {user["id"]: user for user in users}
+
+    async def find_one(self, query, projection=None):
+        user = self._users.get(query["id"])
+        return dict(user) if user else None
+
+
+class _DB:
+    def __init__(self, users):
+        self.users = _Users(users)
+
+
+def build_app(db) -> FastAPI:
+    app = FastAPI()
+    app.dependency_overrides[get_db] = lambda: db
+
+    @app.get("/admin")
+    async def admin(user=Depends(security.require_role(["admin"]))):
+        return {"id": user["id"]}
+
+    return app
+
+
+async def load(app: FastAPI, tokens, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    rng = random.Random(5)
+    queue = [rng.choice(tokens) for _ in range(requests)]
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(share):
+            for token in share:
+                response = await client.get("/admin", headers={"Authorization": f"Bearer {token}"})
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(queue[i::concurrency]) for i in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def chain(db, tokens, requests: int, concurrency: int) -> float:
+    """
+    The same dependencies awaited directly, without HTTP/ASGI overhead.
+    """
+    checker = security.require_role(["admin"])
+    rng = random.Random(5)
+    queue = [rng.choice(tokens) for _ in range(requests)]
+
+    async def worker(share):
+        for token in share:
+            credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+            user = await security.get_current_user(credentials, db)
+            await checker(user)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(queue[i::concurrency]) for i in range(concurrency)))
+    return requests / (time.perf_counter() - start)
+
+
+def decode_rate(tokens, rounds: int) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        security.decode_token(tokens[i % len(tokens)])
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--decodes", type=int, default=50_000)
+    args = parser.parse_args()
+
+    users = [{"id": f"user-{n}", "role": "admin"} for n in range(args.users)]
+    tokens = [
+        security.create_access_token({"sub": user["id"], "role": "ADMIN"})
+        for user in users
+    ]
+    db = _DB(users)
+    app = build_app(db)
+    cache = security._token_cache
+    maxsize = cache.maxsize
+
+    for label, size in (("no token cache", 0), ("token cache", maxsize)):
+        cache.maxsize = size
+        cache.clear()
+        security.clear_user_cache()
+        per_decode = decode_rate(tokens, args.decodes)
+        direct = asyncio.run(chain(db, tokens, args.requests * 5, args.concurrency))
+        http = asyncio.run(load(app, tokens, args.requests, args.concurrency))
+        print(
+            f"{label:>14}: decode_token {per_decode:5.1f} us | "
+            f"dependency chain {direct:8,.0f}/s | "
+            f"through ASGI {http:6,.0f} requests/s (concurrency {args.concurrency})"
+        )
+    cache.maxsize = maxsize
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Image derivative throughput: images/s for 1..N pool workers, and per
+core.
+
+    cd backend
+    python -m benchmarks.image_derivatives --images 48 --width 4000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from modules.media.images import Image, render_derivatives
+
+
+def make_images(directory: Path, count: int, width: int):
+    height = width * 3 // 4
+    rng = random.Random(42)
+    paths = []
+    for i in range(count):
+        # Noise + gradient so the encoders do real work
+        noise = Image.effect_noise((width, height), rng.randint(20, 60)).convert("RGB")
+        image = Image.blend(noise, Image.linear_gradient("L").resize((width, height)).convert("RGB"), 0.5)
+        path = directory / f"source-{i}.jpg"
+        image.save(path, "JPEG", quality=92)
+        paths.append(path)
+    return paths
+
+
+def run(paths, out: Path, workers: int) -> float:
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    ) as pool:
+        # Warm the workers up before timing
+        for future in [pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+        start = time.perf_counter()
+        futures = [
+            pool.submit(render_derivatives, str(path), str(out / f"{workers}-{path.name}"))
+            for path in paths
+        ]
+        for future in futures:
+            future.result()
+    return len(paths) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=24)
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--workers", type=int, action="append")
+    args = parser.parse_args()
+
+    if Image is None:
+        raise SystemExit("Pillow is not installed")
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, max(1, cores // 2), cores})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        paths = make_images(tmp, args.images, args.width)
+        print(f"{args.images} images, {args.width}px wide, {cores} cores")
+        print(f"{'workers':>8}{'images/s':>12}{'per worker':>12}")
+        for n in workers:
+            rate = run(paths, tmp, n)
+            print(f"{n:>8}{rate:>12.1f}{rate / n:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Listing search benchmark: ListingIndex vs the NumPy columnar store.
+
+    cd backend
+    python -m benchmarks.listing_search --n 100000 --n 1000000
+"""
+import argparse
+import random
+import time
+import uuid
+
+from modules.listings.columnar import ColumnarListings
+from modules.listings.indexes import ListingIndex
+
+CITIES = ["Noida", "Delhi", "Gurgaon", "Pune", "Mumbai", "Bengaluru"]
+TYPES = ["RENT", "PRE_OCCUPIED", "BUY"]
+
+QUERIES = [
+    ("city", {"city": "Noida"}, {}),
+    ("city+bhk+price", {"city": "Pune", "bhk": 2, "min_price": 15000, "max_price": 30000}, {}),
+    ("type+price_low", {"listing_type": "BUY"}, {"sort": "price_low"}),
+    ("newest", {}, {"sort": "newest"}),
+    ("bbox", {}, {"bbox": (28.50, 77.30, 28.60, 77.40)}),
+    ("near 3km+bhk", {"bhk": 3}, {"near": (28.57, 77.32), "radius_km": 3.0}),
+]
+
+
+def make_listing(rng: random.Random) -> dict:
+    listing_type = rng.choice(TYPES)
+    listing = {
+        "id": str(uuid.uuid4()),
+        "status": "PUBLISHED" if rng.random() < 0.9 else "DRAFT",
+        "listing_type": listing_type,
+        "city": rng.choice(CITIES),
+        "bhk": rng.randint(1, 5),
+        "lat": 28.4 + rng.random() * 0.4,
+        "lng": 77.0 + rng.random() * 0.5,
+    }
+    if listing_type == "BUY":
+        listing["sale_price"] = rng.randint(20, 300) * 100000
+    else:
+        listing["rent_monthly"] = rng.randint(5, 80) * 1000
+    return listing
+
+
+def timed(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def run(n: int, repeat: int):
+    rng = random.Random(42)
+    listings = [make_listing(rng) for _ in range(n)]
+
+    columns = ColumnarListings()
+    index = ListingIndex()
+    start = time.perf_counter()
+    for listing in listings:
+        columns.add(listing)
+    col_load = time.perf_counter() - start
+    start = time.perf_counter()
+    index.load(listings)
+    idx_load = time.perf_counter() - start
+
+    print(f"\n{n:,} listings (load: columnar {col_load:.1f}s, index {idx_load:.1f}s)")
+    print(f"{'query':<18}{'columnar ms':>14}{'index ms':>12}")
+
+    for name, filters, extra in QUERIES:
+        filters = {"status": "PUBLISHED", **filters}
+        col_ms = timed(lambda: columns.page(filters, limit=20, **extra), repeat)
+
+        # Geo filters need the GeoGrid, which is benchmarked with the service
+        idx_ms = float("nan")
+        if "bbox" not in extra and "near" not in extra:
+            idx_ms = timed(
+                lambda: index.page(filters, sort=extra.get("sort"), limit=20),
+                repeat,
+            )
+        print(f"{name:<18}{col_ms:>14.2f}{idx_ms:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, action="append")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    for n in args.n or [100_000]:
+        run(n, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Warm start benchmark: restore listings from snapshot + WAL and rebuild
+every search index.
+
+    cd backend
+    python -m benchmarks.listing_warm_start --n 1000000 --wal 50000
+"""
+import argparse
+import random
+import tempfile
+import time
+import uuid
+
+from modules.listings import service
+from modules.listings.persistence import ListingLog
+from modules.listings.text_index import TextIndex
+
+LOCALITIES = ["Sector 62", "Sector 18", "Indirapuram", "Vaishali", "Sector 137"]
+
+
+def make_listing(rng: random.Random, i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "status": "PUBLISHED",
+        "version": 2,
+        "title": f"{rng.randint(1, 4)} BHK {rng.choice(['furnished', 'semi-furnished', 'unfurnished'])} flat",
+        "listing_type": "RENT",
+        "city": rng.choice(["Noida", "Ghaziabad", "Delhi"]),
+        "locality": rng.choice(LOCALITIES),
+        "bhk": rng.randint(1, 4),
+        "beds": 2,
+        "baths": 2,
+        "area_sqft": rng.randint(400, 2000),
+        "rent_monthly": rng.randint(5, 80) * 1000,
+        "deposit": 50000,
+        "lat": 28.4 + rng.random() * 0.4,
+        "lng": 77.0 + rng.random() * 0.5,
+        "media": [{"url": f"/uploads/{i}.png", "order": 0, "is_cover": True}],
+        "cover_image_url": f"/uploads/{i}.png",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--wal", type=int, default=50_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as directory:
+        log = ListingLog(directory)
+        listings = {}
+        for i in range(args.n):
+            listing = make_listing(rng, i)
+            listings[listing["id"]] = listing
+
+        text = TextIndex()
+        text.load(listings.values())
+        start = time.perf_counter()
+        log.snapshot(listings, {"text": text.export()})
+        print(f"snapshot write: {time.perf_counter() - start:.2f}s for {args.n:,} listings")
+        del text
+
+        ids = list(listings)
+        start = time.perf_counter()
+        for _ in range(args.wal):
+            listing = dict(listings[rng.choice(ids)], rent_monthly=rng.randint(5, 80) * 1000)
+            log.append(listing)
+        log.close()
+        print(f"wal append: {args.wal / (time.perf_counter() - start):,.0f} records/s")
+        del listings
+
+        start = time.perf_counter()
+        restored = ListingLog(directory).load()
+        read = time.perf_counter() - start
+        print(f"read snapshot + {args.wal:,} wal records: {read:.2f}s")
+
+        start = time.perf_counter()
+        service._rebuild(*restored)
+        rebuild = time.perf_counter() - start
+        print(f"rebuild indexes: {rebuild:.2f}s")
+        print(f"warm start total: {read + rebuild:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+OTP request bursts against the OTP stores: one shard vs sharded memory,
+and SQLite shared by several worker processes.
+
+    cd backend
+    python -m benchmarks.otp_store --phones 200000 --threads 8 --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+
+from modules.user_auth.otp_store import MemoryOTPStore, SQLiteOTPStore
+
+WINDOW_SECONDS = 600
+WINDOW_LIMIT = 3
+EXPIRY_SECONDS = 300
+
+
+def request(store, phone: str, now: float) -> bool:
+    # The store calls request_otp() makes, minus OTP generation
+    session = store.get(phone, now)
+    if session and now - session["last_sent_at"] < 60:
+        return False
+    if not store.hit(phone, now, WINDOW_SECONDS, WINDOW_LIMIT):
+        return False
+    store.put(phone, now, {
+        "otp": "123456",
+        "expires_at": now + EXPIRY_SECONDS,
+        "attempts": 0,
+        "locked_until": None,
+        "last_sent_at": now,
+    })
+    return True
+
+
+def burst(store, phones, threads: int, seed: int) -> float:
+    """
+    Every thread sends its share of requests as fast as it can; a
+    quarter of them repeat a phone already seen (cooldown/window hits).
+    Returns requests per second.
+    """
+    start_at = time.time()
+    chunks = [phones[i::threads] for i in range(threads)]
+
+    def run(chunk, rng):
+        for i, phone in enumerate(chunk):
+            if i and rng.random() < 0.25:
+                phone = chunk[rng.randrange(i)]
+            request(store, phone, start_at + i * 0.01)
+
+    workers = [
+        threading.Thread(target=run, args=(chunk, random.Random(seed + n)))
+        for n, chunk in enumerate(chunks)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return len(phones) / (time.perf_counter() - start)
+
+
+def _sqlite_worker(path, phones, threads, seed, results):
+    store = SQLiteOTPStore(path)
+    results.put(burst(store, phones, threads, seed))
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--phones", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sqlite-phones", type=int, default=20_000)
+    args = parser.parse_args()
+
+    phones = [f"9{n:09d}" for n in range(args.phones)]
+    random.Random(3).shuffle(phones)
+
+    for shards in (1, args.shards):
+        store = MemoryOTPStore(shards)
+        rate = burst(store, phones, args.threads, seed=1)
+        live = len(store)
+        # Everything has expired an hour later
+        start = time.perf_counter()
+        evicted = store.sweep(time.time() + 3600 + args.phones)
+        sweep = time.perf_counter() - start
+        print(
+            f"memory, {shards:>2} shard(s): {rate:,.0f} requests/s, "
+            f"{live:,} live sessions, swept {evicted:,} entries in {sweep * 1000:.0f} ms, "
+            f"{len(store)} left"
+        )
+
+    path = os.path.join(tempfile.mkdtemp(), "otp.sqlite3")
+    sample = phones[:args.sqlite_phones]
+    share = [sample[i::args.workers] for i in range(args.workers)]
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=_sqlite_worker, args=(path, share[n], args.threads, n, results)
+        )
+        for n in range(args.workers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    rates = [results.get() for _ in processes]
+    print(
+        f"sqlite, {args.workers} workers x {args.threads} threads: "
+        f"{len(sample) / elapsed:,.0f} requests/s total "
+        f"({', '.join(f'{rate:,.0f}' for rate in rates)} per worker)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+WhatsApp status callbacks against a large lead store: message-id index
+vs the old scan over every lead.
+
+    cd backend
+    python -m benchmarks.whatsapp_webhook --leads 1000000 --callbacks 10000
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime
+
+from modules.leads import service
+
+STATUSES = ("sent", "delivered", "read")
+
+
+def populate(n: int):
+    now = datetime.utcnow()
+    for _ in range(n):
+        lead_id = str(uuid.uuid4())
+        lead = {
+            "id": lead_id,
+            "type": "OWNER",
+            "stage": "NEW",
+            "created_at": now,
+            "updated_at": now,
+        }
+        service._leads[lead_id] = lead
+        service._record_message(lead, f"OWNER_{uuid.uuid4()}")
+
+
+def scan(message_id: str, status: str):
+    # What the webhook did before the index
+    for lead in service._leads.values():
+        if lead.get("whatsapp_message_id") == message_id:
+            lead["whatsapp_status"] = status
+            lead["updated_at"] = datetime.utcnow()
+            break
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    parser.add_argument("--callbacks", type=int, default=10_000)
+    parser.add_argument("--scan-sample", type=int, default=20)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    populate(args.leads)
+    print(f"{args.leads:,} leads in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(7)
+    message_ids = list(service._by_message_id)
+    # Bursts: each message gets its delivered + read callbacks together
+    callbacks = []
+    while len(callbacks) < args.callbacks:
+        message_id = rng.choice(message_ids)
+        callbacks += [(message_id, "delivered"), (message_id, "read")]
+    callbacks = callbacks[:args.callbacks]
+
+    start = time.perf_counter()
+    for message_id, status in callbacks:
+        service.update_whatsapp_status(message_id, status)
+    indexed = time.perf_counter() - start
+    print(
+        f"indexed: {len(callbacks):,} callbacks in {indexed * 1000:.1f} ms "
+        f"({len(callbacks) / indexed:,.0f}/s, {indexed / len(callbacks) * 1e6:.2f} us each)"
+    )
+
+    sample = callbacks[:args.scan_sample]
+    start = time.perf_counter()
+    for message_id, status in sample:
+        scan(message_id, status)
+    scanned = (time.perf_counter() - start) / len(sample)
+    print(
+        f"scan:    {scanned * 1000:.1f} ms each ({1 / scanned:,.0f}/s), "
+        f"sampled over {len(sample)} callbacks"
+    )
+
+
+if __name__ == "__main__":
+    main()
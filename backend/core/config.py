@@ -24,5 +24,63 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(
     os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 60 * 24)
 )
 
+# Password hashing: bcrypt cost (hashes at another cost are upgraded on
+# login), worker processes (0 = min(4, CPUs)) and how many more hashes
+# may wait before logins are turned away
+PASSWORD_BCRYPT_ROUNDS = int(os.environ.get("PASSWORD_BCRYPT_ROUNDS", 12))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", 0))
+PASSWORD_MAX_QUEUE = int(os.environ.get("PASSWORD_MAX_QUEUE", 64))
+
+# Verified access tokens kept per process; 0 disables the cache
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 50_000))
+
+# Per-process cache of users looked up by get_current_user
+USER_CACHE_TTL_SECONDS = float(os.environ.get("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10_000))
+
+# Listings
+# Mirror listings into NumPy columns and search with vectorized masks
+LISTINGS_COLUMNAR = os.environ.get("LISTINGS_COLUMNAR", "").lower() in ("1", "true")
+# Write-ahead log + snapshot directory; empty disables persistence
+LISTINGS_DATA_DIR = os.environ.get("LISTINGS_DATA_DIR", str(BASE_DIR / "data"))
+LISTINGS_WAL_FSYNC = os.environ.get("LISTINGS_WAL_FSYNC", "").lower() in ("1", "true")
+LISTINGS_SNAPSHOT_EVERY = int(os.environ.get("LISTINGS_SNAPSHOT_EVERY", 50_000))
+
+# WhatsApp provider; only the mock is wired up so far (AiSensy /
+# Interakt later), so anything else is a configuration error
+WHATSAPP_PROVIDERS = ("MOCK",)
+WHATSAPP_PROVIDER = os.environ.get("WHATSAPP_PROVIDER", "MOCK").upper()
+if WHATSAPP_PROVIDER not in WHATSAPP_PROVIDERS:
+    raise ValueError(
+        f"WHATSAPP_PROVIDER={WHATSAPP_PROVIDER!r} is not supported; "
+        f"use one of {', '.join(WHATSAPP_PROVIDERS)}"
+    )
+
+# WhatsApp outbox (SQLite); empty keeps it in memory
+WHATSAPP_OUTBOX_PATH = os.environ.get(
+    "WHATSAPP_OUTBOX_PATH", str(BASE_DIR / "data" / "whatsapp_outbox.sqlite3")
+)
+WHATSAPP_SEND_CONCURRENCY = int(os.environ.get("WHATSAPP_SEND_CONCURRENCY", 8))
+WHATSAPP_SEND_BATCH = int(os.environ.get("WHATSAPP_SEND_BATCH", 50))
+WHATSAPP_MAX_ATTEMPTS = int(os.environ.get("WHATSAPP_MAX_ATTEMPTS", 6))
+WHATSAPP_RETRY_BASE_SECONDS = float(os.environ.get("WHATSAPP_RETRY_BASE_SECONDS", 2))
+# A claimed message not sent within this long is handed to another worker
+WHATSAPP_CLAIM_SECONDS = float(os.environ.get("WHATSAPP_CLAIM_SECONDS", 60))
+
+# OTP sessions; set a SQLite path to share them across uvicorn workers
+OTP_STORE_PATH = os.environ.get("OTP_STORE_PATH", "")
+OTP_STORE_SHARDS = int(os.environ.get("OTP_STORE_SHARDS", 16))
+
+# Revoked refresh-token jtis, shared by all workers; empty keeps them in memory
+REVOCATION_STORE_PATH = os.environ.get(
+    "REVOCATION_STORE_PATH", str(BASE_DIR / "data" / "revoked_tokens.sqlite3")
+)
+
+# Uploads / image derivatives
+UPLOADS_DIR = BASE_DIR / "uploads"
+# Derivative worker processes; 0 means one per CPU
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 0))
+MEDIA_MAX_UPLOAD_BYTES = int(os.environ.get("MEDIA_MAX_UPLOAD_MB", 20)) * 1024 * 1024
+
 # CORS
 CORS_ORIGINS = ["*"]
\ No newline at end of file
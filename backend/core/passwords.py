@@ -0,0 +1,215 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+import bcrypt
+
+from core.config import PASSWORD_BCRYPT_ROUNDS, PASSWORD_WORKERS, PASSWORD_MAX_QUEUE
+from core.process_pool import process_pool
+
+logger = logging.getLogger(__name__)
+
+# passlib's bcrypt_sha256 format, so hashes stay readable by passlib:
+#   $bcrypt-sha256$v=2,t=2b,r=12$<salt>$<digest>
+# The password is HMAC-SHA256'd with the salt first, so bcrypt's 72-byte
+# limit never truncates it.
+SHA256_PREFIX = "$bcrypt-sha256$"
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+# bcrypt ignores everything past this; plain-bcrypt hashes were made
+# from the first 72 bytes
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordServiceBusy(Exception):
+    """
+    More hashing work is queued than PASSWORD_MAX_QUEUE allows.
+    """
+
+
+def _sha256_key(password: str, salt: str) -> bytes:
+    digest = hmac.new(salt.encode("ascii"), password.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest)
+
+
+def _parse_sha256(hashed: str) -> Tuple[int, str, int, str, str]:
+    """
+    (version, ident, rounds, salt, digest) of a bcrypt_sha256 hash.
+    """
+    params, salt, digest = hashed[len(SHA256_PREFIX):].split("$")
+    if params.startswith("v="):
+        fields = dict(item.split("=") for item in params.split(","))
+        return int(fields["v"]), fields["t"], int(fields["r"]), salt, digest
+    # v1: "$bcrypt-sha256$2b,12$..."
+    ident, rounds = params.split(",")
+    return 1, ident, int(rounds), salt, digest
+
+
+def hash_password(password: str, rounds: int = PASSWORD_BCRYPT_ROUNDS) -> str:
+    config = bcrypt.gensalt(rounds).decode("ascii")
+    salt = config[-22:]
+    digest = bcrypt.hashpw(_sha256_key(password, salt), config.encode("ascii"))
+    return f"{SHA256_PREFIX}v=2,t=2b,r={rounds}${salt}${digest.decode('ascii')[-31:]}"
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """
+    Checks bcrypt_sha256 (v1 and v2) and plain bcrypt hashes. Malformed
+    hashes never verify.
+    """
+    try:
+        if hashed.startswith(SHA256_PREFIX):
+            version, ident, rounds, salt, digest = _parse_sha256(hashed)
+            if version == 1:
+                key = base64.b64encode(hashlib.sha256(password.encode("utf-8")).digest())
+            else:
+                key = _sha256_key(password, salt)
+            config = f"${ident}${rounds:02d}${salt}".encode("ascii")
+            computed = bcrypt.hashpw(key, config).decode("ascii")[-31:]
+            return hmac.compare_digest(computed, digest)
+        if hashed.startswith(BCRYPT_PREFIXES):
+            secret = password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+            return bcrypt.checkpw(secret, hashed.encode("ascii"))
+    except (ValueError, KeyError):
+        pass
+    return False
+
+
+def needs_rehash(hashed: str, rounds: int = PASSWORD_BCRYPT_ROUNDS) -> bool:
+    """
+    True for anything but a v2 bcrypt_sha256 hash at `rounds`.
+    """
+    if not hashed.startswith(SHA256_PREFIX):
+        return True
+    try:
+        version, _, hash_rounds, _, _ = _parse_sha256(hashed)
+    except (ValueError, KeyError):
+        return True
+    return version != 2 or hash_rounds != rounds
+
+
+def verify_and_rehash(password: str, hashed: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    """
+    (verified, new hash or None); the new hash is only made after a
+    successful check of an outdated hash. One pool round trip for both.
+    """
+    if not verify_password(password, hashed):
+        return False, None
+    if needs_rehash(hashed, rounds):
+        return True, hash_password(password, rounds)
+    return True, None
+
+
+class PasswordService:
+    """
+    Runs bcrypt in a process pool so a burst of logins cannot stall
+    the event loop (or, via the GIL, the threadpool). At most `workers`
+    hashes run at once and up to `max_queue` more wait; past that calls
+    fail fast with PasswordServiceBusy instead of piling up.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_WORKERS,
+        max_queue: int = PASSWORD_MAX_QUEUE,
+        rounds: int = PASSWORD_BCRYPT_ROUNDS,
+    ):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._total_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = process_pool(self.workers)
+        return self._pool
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordServiceBusy("Password hashing queue is full")
+            self._in_flight += 1
+            self.max_queued = max(self.max_queued, self._in_flight - self.workers)
+            pool = self._get_pool()
+
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            # A worker died; the next call starts a fresh pool
+            logger.error("Password hashing pool broke; restarting it")
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+                self._total_seconds += time.perf_counter() - start
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(verify_password, password, hashed)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Like verify(), also returning a replacement hash when `hashed`
+        was made with another cost or scheme; store it to upgrade the
+        user on login.
+        """
+        verified, new_hash = await self._run(verify_and_rehash, password, hashed, self.rounds)
+        if new_hash:
+            with self._lock:
+                self.rehashed += 1
+        return verified, new_hash
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "rounds": self.rounds,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "max_queue": self.max_queue,
+                "max_queued": self.max_queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "rehashed": self.rehashed,
+                "avg_ms": round(self._total_seconds / self.completed * 1000, 1)
+                if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_service = PasswordService()
+
+
+def get_password_service() -> PasswordService:
+    return _service
+
+
+def shutdown_pool():
+    _service.shutdown()
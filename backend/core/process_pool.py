@@ -0,0 +1,15 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    A pool of `workers` processes for CPU-bound work kept off the event
+    loop. Workers are spawned, not forked: a fork copies the parent's
+    event loop and threadpool threads mid-flight, along with any locks
+    they hold, and the child can deadlock on them.
+    """
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
@@ -1,29 +1,29 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
-from typing import Optional, List
+from typing import Dict, Optional, List
 from uuid import uuid4
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 
 from core.config import JWT_SECRET, JWT_ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 from core.database import get_db
+from core import passwords
+from core.token_cache import VerifiedTokenCache, token_digest
+from core.user_cache import UserCache
 
 # =========================
 # PASSWORD UTILS
 # =========================
 
-pwd_context = CryptContext(
-    schemes=["bcrypt_sha256"],
-    deprecated="auto"
-)
-
+# Blocking, for scripts; request handlers await the pool in
+# core.passwords.get_password_service() instead
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return passwords.verify_password(plain, hashed)
 
 # =========================
 # JWT CONFIG
@@ -69,9 +69,17 @@ def create_refresh_token(data: dict):
 # TOKEN DECODER
 # =========================
 
+_token_cache = VerifiedTokenCache()
+
+
 def decode_token(token: str):
+    digest = token_digest(token)
+    payload = _token_cache.get(digest)
+    if payload is not None:
+        return payload
+
     try:
-        return jwt.decode(
+        payload = jwt.decode(
             token,
             JWT_SECRET,
             algorithms=[JWT_ALGORITHM],
@@ -81,6 +89,67 @@ def decode_token(token: str):
     except JWTError:
         return None
 
+    # Only access tokens: refresh tokens can be revoked by jti and are
+    # decoded rarely, so they are always verified afresh
+    if payload.get("type") == "access":
+        _token_cache.put(digest, payload)
+    return payload
+
+
+def token_cache_stats() -> dict:
+    return _token_cache.stats()
+
+# =========================
+# USER CACHE
+# =========================
+
+_user_cache = UserCache()
+# user_id -> lookup in flight, shared by concurrent requests
+_user_loads: Dict[str, asyncio.Future] = {}
+
+
+def invalidate_user(user_id: str):
+    """
+    Call after changing a user's role or status so the next request
+    reads it from the database.
+    """
+    _user_cache.invalidate(user_id)
+
+
+def clear_user_cache():
+    _user_cache.clear()
+
+
+def user_cache_stats() -> dict:
+    return _user_cache.stats()
+
+
+async def _load_user(db, user_id: str) -> Optional[dict]:
+    pending = _user_loads.get(user_id)
+    if pending is not None:
+        user = await asyncio.shield(pending)
+        return dict(user) if user else None
+
+    future = asyncio.get_running_loop().create_future()
+    _user_loads[user_id] = future
+    generation = _user_cache.generation
+    try:
+        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        if user:
+            #NORMALIZE ROLE
+            if "role" in user and isinstance(user["role"], str):
+                user["role"] = user["role"].upper()
+            _user_cache.put(user_id, user, generation)
+        future.set_result(user)
+    except BaseException as e:
+        future.set_exception(e)
+        # Waiters re-raise it; don't log it as never retrieved
+        future.exception()
+        raise
+    finally:
+        _user_loads.pop(user_id, None)
+    return dict(user) if user else None
+
 # =========================
 # CURRENT USER
 # =========================
@@ -98,15 +167,13 @@ async def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = await db.users.find_one({"id": user_id}, {"_id": 0})
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = await _load_user(db, user_id)
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    #NORMALIZE ROLE
-    if "role" in user and isinstance(user["role"], str):
-        user["role"] = user["role"].upper()
-
     return user
 
 # =========================
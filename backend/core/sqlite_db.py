@@ -0,0 +1,52 @@
+import sqlite3
+import threading
+from pathlib import Path
+
+
+def connect(path: str, schema: str) -> sqlite3.Connection:
+    """
+    Opens the SQLite file at `path` (in memory when empty) and applies
+    `schema`. WAL lets other worker processes read while one writes.
+    The connection is in autocommit mode; multi-statement writes go
+    through Immediate.
+
+    One connection serves all of a process's request threads and its
+    event loop, so every use must hold the owning store's lock.
+    """
+    if path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        path or ":memory:", timeout=10.0, isolation_level=None, check_same_thread=False
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(schema)
+    return conn
+
+
+class Immediate:
+    """
+    `with Immediate(conn, lock) as conn:` holds `lock` and runs the
+    block in a BEGIN IMMEDIATE transaction. That takes SQLite's write
+    lock up front, so read-modify-write blocks from other processes
+    queue instead of overlapping.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.lock.acquire()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self.lock.release()
+            raise
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.lock.release()
@@ -0,0 +1,87 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from core.config import USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS
+
+
+class UserCache:
+    """
+    LRU of user documents keyed by user id, each entry valid for `ttl`
+    seconds. The TTL bounds how stale a role or status can be when it
+    is changed somewhere that does not call invalidate() (another
+    worker, a script against Mongo).
+    """
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.invalidated = 0
+        # Bumped by every invalidation; loads that started before one
+        # must not re-cache what they read
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, user_id: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._entries[user_id]
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+        return dict(entry[1])
+
+    def put(self, user_id: str, user: dict, generation: Optional[int] = None):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[user_id] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self.generation += 1
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidated += 1
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidated += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "expired": self.expired,
+                "evicted": self.evicted,
+                "invalidated": self.invalidated,
+            }
@@ -4,6 +4,7 @@ from jose import jwt
 from typing import Dict
 import uuid
 
+from modules.auth import service
 from modules.auth.schemas import (
     UserCreate,
     UserLogin,
@@ -57,14 +58,18 @@ def create_refresh_token(subject: str):
 # REGISTER (USER)
 # ===============================
 @router.post("/register")
-def register(payload: UserCreate):
+async def register(payload: UserCreate):
+    if payload.email in _fake_users:
+        raise HTTPException(status_code=400, detail="User already exists")
+
+    password_hash = await service.hash_password_async(payload.password)
     if payload.email in _fake_users:
         raise HTTPException(status_code=400, detail="User already exists")
 
     _fake_users[payload.email] = {
         "id": str(uuid.uuid4()),
         "email": payload.email,
-        "password": payload.password,  
+        "password_hash": password_hash,
         "role": "USER",
         "created_at": datetime.utcnow()
     }
@@ -75,10 +80,10 @@ def register(payload: UserCreate):
 # LOGIN (USER)
 # ===============================
 @router.post("/login", response_model=TokenResponse)
-def login(payload: UserLogin):
+async def login(payload: UserLogin):
     user = _fake_users.get(payload.email)
 
-    if not user or user["password"] != payload.password:
+    if not user or not await service.check_password(user, payload.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     access = create_access_token(user["id"], user["role"])
@@ -94,13 +99,13 @@ def login(payload: UserLogin):
 # ADMIN LOGIN
 # ===============================
 @router.post("/admin/auth/login", response_model=TokenResponse)
-def admin_login(payload: AdminLogin):
+async def admin_login(payload: AdminLogin):
     user = _fake_users.get(payload.email)
 
     if not user or user["role"] != "ADMIN":
         raise HTTPException(status_code=403, detail="Admin access required")
 
-    if user["password"] != payload.password:
+    if not await service.check_password(user, payload.password):
         raise HTTPException(status_code=401, detail="Invalid admin credentials")
 
     access = create_access_token(user["id"], user["role"])
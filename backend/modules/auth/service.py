@@ -1,11 +1,53 @@
-from passlib.context import CryptContext
+import hmac
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from fastapi import HTTPException
+
+from core import passwords
+from core.passwords import PasswordServiceBusy, get_password_service
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)
+
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many logins in progress. Try again shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    try:
+        return await get_password_service().hash(password)
+    except PasswordServiceBusy:
+        raise _busy()
+
+
+async def check_password(user: dict, password: str) -> bool:
+    """
+    Verifies `password` for `user` off the event loop. A hash made with
+    another cost or scheme is replaced on success, and seeded users that
+    still carry a plaintext password get a hash on their first login.
+    """
+    hashed = user.get("password_hash")
+    if hashed is None:
+        plain = user.get("password")
+        if plain is None or not hmac.compare_digest(plain.encode(), password.encode()):
+            return False
+        user["password_hash"] = await hash_password_async(password)
+        user.pop("password", None)
+        return True
+
+    try:
+        verified, new_hash = await get_password_service().verify_and_update(password, hashed)
+    except PasswordServiceBusy:
+        raise _busy()
+    if verified and new_hash:
+        user["password_hash"] = new_hash
+    return verified
@@ -2,6 +2,8 @@ from fastapi import APIRouter, Depends
 
 from modules.dashboard.schemas import DashboardStats
 from modules.dashboard.service import get_admin_dashboard_stats
+from core.security import token_cache_stats, user_cache_stats
+from core.passwords import get_password_service
 
 try:
     # current working RBAC
@@ -30,6 +32,17 @@ async def admin_dashboard(
     return await get_admin_dashboard_stats()
 
 
+@router.get("/auth-cache")
+async def auth_cache_stats(
+    user=Depends(require_role(["admin"]))
+):
+    return {
+        "users": user_cache_stats(),
+        "tokens": token_cache_stats(),
+        "passwords": get_password_service().stats(),
+    }
+
+
 @router.get("/ping")
 async def ping():
     return {"message": "Dashboard working"}
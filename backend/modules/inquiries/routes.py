@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 
 from modules.inquiries.schemas import Inquiry, InquiryCreate, InquiryUpdate
@@ -8,7 +9,10 @@ from modules.inquiries.service import (
     get_inquiry_by_id,
     update_inquiry,
     assign_agent,
+    iter_inquiries,
+    EXPORT_FIELDS,
 )
+from core.export import EXPORT_MEDIA_TYPES, aencode_rows, export_headers
 
 from core.database import get_db
 try:
@@ -55,6 +59,29 @@ async def list_all(
     return await list_inquiries(filters, limit)
 
 
+@router.get("/export")
+async def export_all(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    stage: Optional[str] = None,
+    inquiry_type: Optional[str] = None,
+    assigned_agent_id: Optional[str] = None,
+    user=Depends(require_role(["admin"]))
+):
+    filters = {}
+    if stage:
+        filters["stage"] = stage
+    if inquiry_type:
+        filters["inquiry_type"] = inquiry_type
+    if assigned_agent_id:
+        filters["assigned_agent_id"] = assigned_agent_id
+
+    return StreamingResponse(
+        aencode_rows(iter_inquiries(filters), EXPORT_FIELDS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=export_headers("inquiries", format),
+    )
+
+
 @router.get("/{inquiry_id}", response_model=Inquiry)
 async def get_one(
     inquiry_id: str,
@@ -4,6 +4,26 @@ from core.database import get_db
 from modules.inquiries.schemas import InquiryCreate, InquiryUpdate
 import uuid 
 
+EXPORT_FIELDS = [
+    "id",
+    "inquiry_type",
+    "stage",
+    "name",
+    "phone",
+    "email",
+    "listing_id",
+    "source_page",
+    "whatsapp_opt_in",
+    "assigned_agent_id",
+    "assigned_agent_name",
+    "next_followup_at",
+    "created_at",
+    "updated_at",
+]
+
+# Documents fetched per round trip while exporting
+EXPORT_BATCH_SIZE = 1000
+
 async def create_inquiry(data: InquiryCreate):
     db = get_db()
     now = datetime.now(timezone.utc)
@@ -29,6 +49,25 @@ async def list_inquiries(filters: dict, limit: int = 100):
     return await db.inquiries.find(filters, {"_id": 0}).sort("created_at", -1).to_list(limit)
 
 
+async def iter_inquiries(filters: dict, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Every matching inquiry, newest first, pulled from a cursor
+    `batch_size` documents at a time.
+    """
+    db = get_db()
+    cursor = (
+        db.inquiries.find(filters, {"_id": 0}, allow_disk_use=True)
+        .sort("created_at", -1)
+        .batch_size(batch_size)
+    )
+    try:
+        async for inquiry in cursor:
+            yield inquiry
+    finally:
+        # Free the server-side cursor if the download is abandoned
+        await cursor.close()
+
+
 async def get_inquiry_by_id(inquiry_id: str):
     db = get_db()
     inquiry = await db.inquiries.find_one({"id": inquiry_id}, {"_id": 0})
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longest the timer sleeps before re-checking the heap
+MAX_SLEEP_SECONDS = 60.0
+
+# Called with (lead_id, due_at) once per scheduled follow-up
+ReminderCallback = Callable[[str, datetime], None]
+
+
+class _IndexedHeap:
+    """
+    Binary min-heap of (due_at, seq, lead_id) with a position map, so a
+    lead's entry is moved or removed in place in O(log N) instead of
+    being left behind as a stale entry.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._pos: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, lead_id: str):
+        return lead_id in self._pos
+
+    def peek(self) -> Optional[Tuple[datetime, int, str]]:
+        return self._heap[0] if self._heap else None
+
+    def push(self, entry: Tuple[datetime, int, str]):
+        lead_id = entry[2]
+        if lead_id in self._pos:
+            i = self._pos[lead_id]
+            old = self._heap[i]
+            self._heap[i] = entry
+            if entry < old:
+                self._sift_up(i)
+            else:
+                self._sift_down(i)
+            return
+        self._heap.append(entry)
+        self._pos[lead_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def remove(self, lead_id: str) -> Optional[Tuple[datetime, int, str]]:
+        i = self._pos.pop(lead_id, None)
+        if i is None:
+            return None
+        entry = self._heap[i]
+        last = self._heap.pop()
+        if i < len(self._heap):
+            self._heap[i] = last
+            self._pos[last[2]] = i
+            self._sift_up(i)
+            self._sift_down(self._pos[last[2]])
+        return entry
+
+    def pop(self) -> Tuple[datetime, int, str]:
+        return self.remove(self._heap[0][2])
+
+    def due(self, now: datetime) -> List[Tuple[datetime, int, str]]:
+        """
+        Entries with due_at <= now, soonest first. Only subtrees whose
+        root is due are visited.
+        """
+        found = []
+        stack = [0] if self._heap else []
+        while stack:
+            i = stack.pop()
+            entry = self._heap[i]
+            if entry[0] > now:
+                continue
+            found.append(entry)
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._heap):
+                    stack.append(child)
+        found.sort()
+        return found
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i][2]] = i
+        self._pos[heap[j][2]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if self._heap[i] >= self._heap[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        n = len(self._heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < n and self._heap[child] < self._heap[smallest]:
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+
+class FollowupScheduler:
+    """
+    Lead follow-ups keyed on next_followup_at.
+
+    `_upcoming` holds follow-ups whose reminder has not fired yet and
+    `_fired` the ones already reminded about but still open; a lead is
+    in at most one of them. Rescheduling or cancelling moves the lead's
+    single entry, and the timer task sleeps until the earliest upcoming
+    follow-up.
+    """
+
+    def __init__(self, on_due: Optional[ReminderCallback] = None):
+        self.on_due = on_due
+        self._upcoming = _IndexedHeap()
+        self._fired = _IndexedHeap()
+        self._seq = 0
+        # Request threads and the timer task
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._upcoming) + len(self._fired)
+
+    def schedule(self, lead_id: str, due_at: datetime):
+        with self._lock:
+            self._fired.remove(lead_id)
+            self._seq += 1
+            self._upcoming.push((due_at, self._seq, lead_id))
+            earliest = self._upcoming.peek()[2] == lead_id
+        if earliest:
+            self._notify()
+
+    def cancel(self, lead_id: str):
+        with self._lock:
+            self._upcoming.remove(lead_id)
+            self._fired.remove(lead_id)
+
+    def due(self, now: datetime, limit: Optional[int] = None) -> List[Tuple[str, datetime]]:
+        """
+        (lead_id, due_at) of every follow-up due by `now`, fired or not,
+        soonest first.
+        """
+        with self._lock:
+            entries = self._fired.due(now) + self._upcoming.due(now)
+        entries.sort()
+        return [(lead_id, due_at) for due_at, _, lead_id in entries[:limit]]
+
+    def fire_due(self, now: datetime) -> int:
+        """
+        Moves follow-ups due by `now` to the fired heap and calls
+        on_due for each. Returns how many fired.
+        """
+        fired = []
+        with self._lock:
+            while self._upcoming and self._upcoming.peek()[0] <= now:
+                entry = self._upcoming.pop()
+                self._fired.push(entry)
+                fired.append(entry)
+        for due_at, _, lead_id in fired:
+            if self.on_due is None:
+                continue
+            try:
+                self.on_due(lead_id, due_at)
+            except Exception:
+                logger.exception("Follow-up reminder failed for lead %s", lead_id)
+        return len(fired)
+
+    def next_due_at(self) -> Optional[datetime]:
+        with self._lock:
+            entry = self._upcoming.peek()
+        return entry[0] if entry else None
+
+    def _notify(self):
+        # schedule() runs in request threads as well as on the loop
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._loop = None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            self.fire_due(datetime.utcnow())
+            next_due = self.next_due_at()
+            timeout = MAX_SLEEP_SECONDS
+            if next_due is not None:
+                timeout = min(timeout, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,166 @@
+import threading
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Funnel depth of each stage; reaching a stage implies the ones before it
+FUNNEL_STAGES = [
+    "NEW",
+    "CONTACTED",
+    "VISIT_REQUESTED",
+    "VISIT_SCHEDULED",
+    "VISIT_DONE",
+    "CLOSED_WON",
+]
+LOST_STAGE = "CLOSED_LOST"
+ALL_STAGES = FUNNEL_STAGES + [LOST_STAGE]
+_DEPTH = {stage: depth for depth, stage in enumerate(FUNNEL_STAGES)}
+
+# Time-in-stage histogram upper bounds, in hours
+HOUR_BUCKETS = [1, 6, 24, 72, 168, 336, 720]
+BUCKET_LABELS = [f"<{h}h" for h in HOUR_BUCKETS] + [f">={HOUR_BUCKETS[-1]}h"]
+
+# Dimensions a funnel can be sliced by; "all" is the overall funnel
+DIMENSIONS = ("all", "listing_id", "source_page", "utm_source", "utm_campaign")
+
+MAX_EVENTS = 100_000
+
+Dim = Tuple[str, Optional[str]]
+# (at, lead_id, from_stage, to_stage); from_stage is None on creation
+Transition = Tuple[datetime, str, Optional[str], str]
+
+
+class _Counters:
+    __slots__ = ("leads", "reached", "lost", "current", "hist", "hours")
+
+    def __init__(self):
+        self.leads = 0
+        self.reached = [0] * len(FUNNEL_STAGES)
+        self.lost = 0
+        self.current = {stage: 0 for stage in ALL_STAGES}
+        self.hist = {stage: [0] * len(BUCKET_LABELS) for stage in ALL_STAGES}
+        self.hours = {stage: 0.0 for stage in ALL_STAGES}
+
+
+def _dims(lead: dict) -> List[Dim]:
+    utm = lead.get("utm") or {}
+    dims = [("all", None)]
+    for dim, value in (
+        ("listing_id", lead.get("listing_id")),
+        ("source_page", lead.get("source_page")),
+        ("utm_source", utm.get("utm_source") or utm.get("source")),
+        ("utm_campaign", utm.get("utm_campaign") or utm.get("campaign")),
+    ):
+        if value:
+            dims.append((dim, str(value)))
+    return dims
+
+
+class FunnelStats:
+    """
+    Materialized lead funnel, updated per stage transition.
+
+    Every dimension value (overall, per listing, per source page, per
+    utm source / campaign) keeps how many leads reached each funnel
+    stage, how many sit in each stage now, and a histogram of time spent
+    in each stage before leaving it. Reading a funnel is a dict lookup.
+    The raw transitions are kept as a bounded event stream.
+    """
+
+    def __init__(self, max_events: int = MAX_EVENTS):
+        self._counters: Dict[Dim, _Counters] = {}
+        # lead_id -> [stage, entered_at, depth, dims]
+        self._state: Dict[str, list] = {}
+        self.events: Deque[Transition] = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+
+    def _for(self, dims: List[Dim]) -> List[_Counters]:
+        counters = []
+        for dim in dims:
+            c = self._counters.get(dim)
+            if c is None:
+                c = self._counters[dim] = _Counters()
+            counters.append(c)
+        return counters
+
+    def record_created(self, lead: dict):
+        lead_id = lead["id"]
+        at = lead["created_at"]
+        stage = lead["stage"]
+        dims = _dims(lead)
+        depth = _DEPTH.get(stage, -1)
+        with self._lock:
+            if lead_id in self._state:
+                return
+            self._state[lead_id] = [stage, at, depth, dims]
+            self.events.append((at, lead_id, None, stage))
+            for c in self._for(dims):
+                c.leads += 1
+                c.current[stage] += 1
+                for d in range(depth + 1):
+                    c.reached[d] += 1
+                if stage == LOST_STAGE:
+                    c.lost += 1
+
+    def record_transition(self, lead_id: str, to_stage: str, at: datetime):
+        with self._lock:
+            state = self._state.get(lead_id)
+            if state is None or state[0] == to_stage:
+                return
+            from_stage, entered_at, depth, dims = state
+            self.events.append((at, lead_id, from_stage, to_stage))
+
+            hours = max(0.0, (at - entered_at).total_seconds() / 3600)
+            # Upper bounds are exclusive: exactly 1h lands in "<6h"
+            bucket = bisect_left(HOUR_BUCKETS, hours + 1e-9)
+            new_depth = max(depth, _DEPTH.get(to_stage, -1))
+
+            for c in self._for(dims):
+                c.current[from_stage] -= 1
+                c.current[to_stage] += 1
+                c.hist[from_stage][bucket] += 1
+                c.hours[from_stage] += hours
+                for d in range(depth + 1, new_depth + 1):
+                    c.reached[d] += 1
+                if to_stage == LOST_STAGE:
+                    c.lost += 1
+            state[:3] = [to_stage, at, new_depth]
+
+    def funnel(self, dim: str = "all", value: Optional[str] = None) -> dict:
+        """
+        Snapshot of one dimension value's counters. Cost depends only on
+        the number of stages and buckets, not on lead volume.
+        """
+        if dim == "all":
+            value = None
+        with self._lock:
+            c = self._counters.get((dim, value)) or _Counters()
+            reached = list(c.reached)
+            current = dict(c.current)
+            hist = {stage: list(c.hist[stage]) for stage in ALL_STAGES}
+            hours = dict(c.hours)
+            leads, lost = c.leads, c.lost
+
+        started = reached[0]
+        time_in_stage = {}
+        for stage in ALL_STAGES:
+            exits = sum(hist[stage])
+            time_in_stage[stage] = {
+                "exits": exits,
+                "mean_hours": round(hours[stage] / exits, 2) if exits else None,
+                "histogram": dict(zip(BUCKET_LABELS, hist[stage])),
+            }
+        return {
+            "dimension": dim,
+            "value": value,
+            "leads": leads,
+            "reached": dict(zip(FUNNEL_STAGES, reached)),
+            "lost": lost,
+            "conversion": {
+                stage: round(n / started, 4) if started else 0.0
+                for stage, n in zip(FUNNEL_STAGES, reached)
+            },
+            "current": current,
+            "time_in_stage": time_in_stage,
+        }
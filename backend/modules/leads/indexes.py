@@ -0,0 +1,124 @@
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
+
+INDEXED_FIELDS = ("type", "stage", "listing_id")
+
+
+def _key(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+class LeadIndex:
+    """
+    Secondary indexes over the in-memory leads.
+
+    Hash indexes map type / stage / listing_id values to lead ids, and
+    `_created` keeps (created_at, seq, id) sorted so results come back
+    in creation order and created_at ranges are a bisect.
+    """
+
+    def __init__(self):
+        self._hash: Dict[str, Dict[object, Set[str]]] = {
+            field: {} for field in INDEXED_FIELDS
+        }
+        self._keys: Dict[str, Dict[str, object]] = {}
+        self._created: List[Tuple[datetime, int, str]] = []
+        # lead_id -> its (created_at, seq, id) entry
+        self._entry: Dict[str, Tuple[datetime, int, str]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, lead: dict):
+        """
+        Indexes a new lead, or re-indexes the fields that changed.
+        """
+        lead_id = lead["id"]
+        old = self._keys.get(lead_id)
+        new = {field: _key(lead.get(field)) for field in INDEXED_FIELDS}
+        if old == new:
+            return
+
+        for field, value in new.items():
+            if old is not None and old[field] == value:
+                continue
+            if old is not None:
+                self._unlink(field, old[field], lead_id)
+            if value is not None:
+                self._hash[field].setdefault(value, set()).add(lead_id)
+        self._keys[lead_id] = new
+
+        if lead_id not in self._entry:
+            entry = self._entry[lead_id] = (lead["created_at"], len(self._entry), lead_id)
+            # Leads arrive in time order, so this is almost always an append
+            if not self._created or entry > self._created[-1]:
+                self._created.append(entry)
+            else:
+                insort(self._created, entry)
+
+    def _unlink(self, field: str, value, lead_id: str):
+        ids = self._hash[field].get(value)
+        if ids is None:
+            return
+        ids.discard(lead_id)
+        if not ids:
+            del self._hash[field][value]
+
+    def _created_range(
+        self,
+        created_after: Optional[datetime],
+        created_before: Optional[datetime],
+    ) -> Tuple[int, int]:
+        lo = 0
+        hi = len(self._created)
+        if created_after is not None:
+            lo = bisect_right(self._created, (created_after, float("inf")))
+        if created_before is not None:
+            hi = bisect_left(self._created, (created_before, -1))
+        return lo, max(lo, hi)
+
+    def query(
+        self,
+        lead_type: Optional[str] = None,
+        stage: Optional[str] = None,
+        listing_id: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> List[str]:
+        """
+        Ids of the matching leads in creation order. created_after and
+        created_before are exclusive bounds.
+        """
+        filters = {"type": lead_type, "stage": stage, "listing_id": listing_id}
+        sets = []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            ids = self._hash[field].get(_key(value))
+            if not ids:
+                return []
+            sets.append(ids)
+
+        lo, hi = self._created_range(created_after, created_before)
+        if not sets:
+            return [lead_id for _, _, lead_id in self._created[lo:hi]]
+
+        sets.sort(key=len)
+        if hi - lo <= len(sets[0]):
+            # Narrow time window: walk it and check the hash sets
+            return [
+                lead_id for _, _, lead_id in self._created[lo:hi]
+                if all(lead_id in ids for ids in sets)
+            ]
+
+        ids = sets[0]
+        for other in sets[1:]:
+            ids = ids & other
+        entries = [self._entry[lead_id] for lead_id in ids]
+        if lo > 0 or hi < len(self._created):
+            first, last = self._created[lo], self._created[hi - 1]
+            entries = [e for e in entries if first <= e <= last]
+        entries.sort()
+        return [lead_id for _, _, lead_id in entries]
@@ -1,4 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import StreamingResponse
+from datetime import datetime
 from typing import List, Optional
 
 from modules.leads.schemas import (
@@ -6,10 +8,14 @@ from modules.leads.schemas import (
     OwnerLeadCreate,
     LeadResponse,
     AdminLeadListItem,
+    AdminDueLeadItem,
+    LeadFunnel,
     LeadStageUpdate,
     LeadNoteCreate
 )
 from modules.leads import service
+from core.export import EXPORT_MEDIA_TYPES, encode_rows, export_headers
+from core import security
 try:
     from core.rbac import require_role
 except ImportError:
@@ -23,7 +29,7 @@ router = APIRouter(prefix="/leads", tags=["Leads"])
 
 @router.post("/tenant", response_model=LeadResponse)
 def create_tenant_lead(payload: TenantLeadCreate):
-    lead, error = service.create_tenant_lead(payload.dict())
+    lead, error = service.create_tenant_lead(**payload.dict())
     if error:
         raise HTTPException(status_code=400, detail=error)
     return {"lead_id": lead["id"], "created": True}
@@ -31,7 +37,7 @@ def create_tenant_lead(payload: TenantLeadCreate):
 
 @router.post("/owner", response_model=LeadResponse)
 def create_owner_lead(payload: OwnerLeadCreate):
-    lead, error = service.create_owner_lead(payload.dict())
+    lead, error = service.create_owner_lead(**payload.dict())
     if error:
         raise HTTPException(status_code=400, detail=error)
     return {
@@ -48,9 +54,60 @@ def create_owner_lead(payload: OwnerLeadCreate):
 def admin_get_leads(
     type: Optional[str] = Query(None),
     stage: Optional[str] = Query(None),
-    listing_id: Optional[str] = Query(None)
+    listing_id: Optional[str] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
 ):
-    return service.get_all_leads(type, stage, listing_id)
+    return service.list_leads(
+        type, stage, listing_id, created_after, created_before
+    )
+
+
+@router.get(
+    "/admin/leads/export",
+    dependencies=[Depends(security.require_role(["admin"]))]
+)
+def admin_export_leads(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    type: Optional[str] = Query(None),
+    stage: Optional[str] = Query(None),
+    listing_id: Optional[str] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+):
+    leads = service.iter_leads(type, stage, listing_id, created_after, created_before)
+    return StreamingResponse(
+        encode_rows(leads, service.EXPORT_FIELDS, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=export_headers("leads", format),
+    )
+
+
+@router.get(
+    "/admin/leads/due",
+    response_model=List[AdminDueLeadItem],
+    dependencies=[Depends(require_role("ADMIN"))]
+)
+def admin_get_due_leads(
+    before: Optional[datetime] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+    return service.list_due_followups(before, limit)
+
+
+@router.get(
+    "/admin/leads/funnel",
+    response_model=LeadFunnel,
+    dependencies=[Depends(require_role("ADMIN"))]
+)
+def admin_get_lead_funnel(
+    dimension: str = Query("all"),
+    value: Optional[str] = Query(None),
+):
+    funnel, error = service.lead_funnel(dimension, value)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return funnel
 
 
 @router.patch(
@@ -58,7 +115,7 @@ def admin_get_leads(
     dependencies=[Depends(require_role("ADMIN"))]
 )
 def admin_update_lead_stage(lead_id: str, payload: LeadStageUpdate):
-    lead = service.update_lead_stage(
+    lead = service.update_lead(
         lead_id,
         payload.stage,
         payload.next_followup_at
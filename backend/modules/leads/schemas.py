@@ -56,6 +56,28 @@ class AdminLeadListItem(BaseModel):
     updated_at: Optional[datetime] = None
 
 
+class AdminDueLeadItem(AdminLeadListItem):
+    next_followup_at: datetime
+    followup_reminded_at: Optional[datetime] = None
+
+
+class FunnelStageTime(BaseModel):
+    exits: int
+    mean_hours: Optional[float] = None
+    histogram: Dict[str, int]
+
+
+class LeadFunnel(BaseModel):
+    dimension: str
+    value: Optional[str] = None
+    leads: int
+    reached: Dict[str, int]
+    lost: int
+    conversion: Dict[str, float]
+    current: Dict[str, int]
+    time_in_stage: Dict[str, FunnelStageTime]
+
+
 class LeadStageUpdate(BaseModel):
     stage: LeadStage
     next_followup_at: Optional[datetime] = None
@@ -1,19 +1,31 @@
 import uuid
 import re
-from datetime import datetime
-from typing import Dict, List, Optional
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
 
 from modules.whatsapp.service import (
-    send_tenant_property_catalogue,
-    send_owner_brochure_message
+    tenant_property_catalogue,
+    owner_brochure_message
 )
+from modules.whatsapp import outbox
+from modules.whatsapp.ingest import status_rank
 from modules.listings.service import get_listing_by_id
+from modules.leads.indexes import LeadIndex
+from modules.leads.followups import FollowupScheduler
+from modules.leads.funnel import DIMENSIONS, FunnelStats
+
+logger = logging.getLogger(__name__)
 
 PHONE_REGEX = re.compile(r"^[6-9]\d{9}$")
 
 # In-memory lead store
 _leads: Dict[str, dict] = {}
 _lead_notes: Dict[str, List[dict]] = {}
+_index = LeadIndex()
+_funnel = FunnelStats()
+# whatsapp_message_id -> lead_id, for provider status callbacks
+_by_message_id: Dict[str, str] = {}
 
 ALLOWED_STAGES = [
     "NEW",
@@ -24,6 +36,94 @@ ALLOWED_STAGES = [
     "CLOSED_WON",
     "CLOSED_LOST",
 ]
+CLOSED_STAGES = {"CLOSED_WON", "CLOSED_LOST"}
+
+EXPORT_FIELDS = [
+    "id",
+    "type",
+    "stage",
+    "name",
+    "phone",
+    "listing_id",
+    "city",
+    "action",
+    "source_page",
+    "utm",
+    "whatsapp_opt_in",
+    "whatsapp_status",
+    "next_followup_at",
+    "created_at",
+    "updated_at",
+]
+
+
+def _remind(lead_id: str, due_at: datetime):
+    lead = _leads.get(lead_id)
+    if not lead:
+        return
+    lead["followup_reminded_at"] = datetime.utcnow()
+    logger.info("Follow-up due for lead %s (%s) at %s", lead_id, lead["name"], due_at)
+
+
+_followups = FollowupScheduler(on_due=_remind)
+
+def _record_message(lead: dict, message_id: Optional[str]):
+    if not message_id:
+        return
+    lead["whatsapp_message_id"] = message_id
+    lead["whatsapp_status"] = "sent"
+    lead["whatsapp_sent_at"] = datetime.utcnow()
+    _by_message_id[message_id] = lead["id"]
+
+
+def record_whatsapp_result(lead_id: str, status: str, message_id: Optional[str]):
+    """
+    Outbox worker callback once a queued message is sent or given up on.
+    """
+    lead = _leads.get(lead_id)
+    if not lead:
+        return
+    if status == outbox.SENT:
+        _record_message(lead, message_id)
+    else:
+        lead["whatsapp_status"] = status
+    lead["updated_at"] = datetime.utcnow()
+
+
+def get_lead_by_message_id(message_id: str) -> Optional[dict]:
+    lead_id = _by_message_id.get(message_id)
+    return _leads.get(lead_id) if lead_id else None
+
+
+def update_whatsapp_status(message_id: str, status: str) -> Optional[dict]:
+    """
+    Applies a provider delivery/read callback to the lead that was sent
+    `message_id`.
+    """
+    if not update_whatsapp_statuses({message_id: status}):
+        return None
+    return get_lead_by_message_id(message_id)
+
+
+def update_whatsapp_statuses(statuses: Dict[str, str]) -> int:
+    """
+    Bulk variant for coalesced webhook batches ({message_id: status}).
+    A status never replaces a later one (read is not undone by a late
+    delivered). Returns how many leads changed.
+    """
+    now = datetime.utcnow()
+    changed = 0
+    for message_id, status in statuses.items():
+        lead = get_lead_by_message_id(message_id)
+        if not lead or lead["whatsapp_status"] == status:
+            continue
+        if status_rank(status) < status_rank(lead["whatsapp_status"]):
+            continue
+        lead["whatsapp_status"] = status
+        lead["updated_at"] = now
+        changed += 1
+    return changed
+
 
 def create_tenant_lead(
     listing_id: str,
@@ -66,15 +166,15 @@ def create_tenant_lead(
     }
 
     _leads[lead_id] = lead
+    _index.add(lead)
+    _funnel.record_created(lead)
 
-    # Auto-send WhatsApp catalogue
+    # Auto-send WhatsApp catalogue (sent by the outbox worker)
     if whatsapp_opt_in:
-        message_id = send_tenant_property_catalogue(lead, listing)
-        lead["whatsapp_message_id"] = message_id
-        lead["whatsapp_status"] = "sent"
-        lead["whatsapp_sent_at"] = datetime.utcnow()
+        lead["whatsapp_status"] = "queued"
+        outbox.enqueue(lead_id, tenant_property_catalogue(lead, listing))
 
-    return lead
+    return lead, None
 
 def create_owner_lead(
     name: str,
@@ -109,32 +209,60 @@ def create_owner_lead(
     }
 
     _leads[lead_id] = lead
+    _index.add(lead)
+    _funnel.record_created(lead)
 
     if whatsapp_opt_in:
-        message_id = send_owner_brochure_message(lead)
-        lead["whatsapp_message_id"] = message_id
-        lead["whatsapp_status"] = "sent"
-        lead["whatsapp_sent_at"] = datetime.utcnow()
+        lead["whatsapp_status"] = "queued"
+        outbox.enqueue(lead_id, owner_brochure_message(lead))
+
+    return lead, None
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Leads are stamped with naive utcnow(); compare like with like
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
-    return lead
 
 def list_leads(
     lead_type: Optional[str] = None,
     stage: Optional[str] = None,
     listing_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
 ):
-    results = list(_leads.values())
-
-    if lead_type:
-        results = [l for l in results if l["type"] == lead_type.upper()]
+    """
+    Leads matching every given filter, oldest first, answered from the
+    lead indexes.
+    """
+    return list(iter_leads(lead_type, stage, listing_id, created_after, created_before))
 
-    if stage:
-        results = [l for l in results if l["stage"] == stage]
-
-    if listing_id:
-        results = [l for l in results if l.get("listing_id") == listing_id]
 
-    return results
+def iter_leads(
+    lead_type: Optional[str] = None,
+    stage: Optional[str] = None,
+    listing_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> Iterator[dict]:
+    """
+    list_leads() one lead at a time, for exports. The matching ids are
+    collected from the index up front; only the lead dicts are looked
+    up as the caller consumes them, so leads deleted meanwhile are
+    skipped.
+    """
+    ids = _index.query(
+        lead_type=lead_type.upper() if lead_type else None,
+        stage=stage or None,
+        listing_id=listing_id or None,
+        created_after=_naive_utc(created_after),
+        created_before=_naive_utc(created_before),
+    )
+    for lead_id in ids:
+        lead = _leads.get(lead_id)
+        if lead is not None:
+            yield lead
 
 
 def update_lead(
@@ -146,18 +274,59 @@ def update_lead(
     if not lead:
         return None
 
+    now = datetime.utcnow()
     if stage:
         if stage not in ALLOWED_STAGES:
             return None
-        lead["stage"] = stage
+        lead["stage"] = getattr(stage, "value", stage)
+        _funnel.record_transition(lead_id, lead["stage"], now)
 
     if next_followup_at:
-        lead["next_followup_at"] = next_followup_at
+        lead["next_followup_at"] = _naive_utc(next_followup_at)
+        lead["followup_reminded_at"] = None
 
-    lead["updated_at"] = datetime.utcnow()
+    if lead["stage"] in CLOSED_STAGES:
+        _followups.cancel(lead_id)
+    elif next_followup_at:
+        _followups.schedule(lead_id, lead["next_followup_at"])
+
+    lead["updated_at"] = now
+    _index.add(lead)
     return lead
 
 
+def lead_funnel(dimension: str = "all", value: Optional[str] = None):
+    """
+    Funnel counters and time-in-stage histograms for all leads or one
+    listing / source page / utm source / utm campaign.
+    """
+    if dimension not in DIMENSIONS:
+        return None, "Unknown funnel dimension"
+    if dimension != "all" and not value:
+        return None, "A value is required for this dimension"
+    return _funnel.funnel(dimension, value), None
+
+
+def list_due_followups(
+    before: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> List[dict]:
+    """
+    Open leads whose next_followup_at is due by `before` (default now),
+    most overdue first, straight from the follow-up heaps.
+    """
+    due = _followups.due(_naive_utc(before) or datetime.utcnow(), limit)
+    return [_leads[lead_id] for lead_id, _ in due]
+
+
+def start_followups():
+    _followups.start()
+
+
+async def stop_followups():
+    await _followups.stop()
+
+
 def add_lead_note(lead_id: str, note: str):
     if lead_id not in _leads:
         return None
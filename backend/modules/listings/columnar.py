@@ -0,0 +1,189 @@
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+from modules.listings.geo import EARTH_RADIUS_KM, radius_bbox
+from modules.listings.indexes import _key, effective_price
+
+CODED_FIELDS = ("status", "listing_type", "city")
+
+_INITIAL_CAPACITY = 1024
+
+
+class ColumnarListings:
+    """
+    Column-per-field mirror of the listing store.
+
+    Rows are allocated in creation order, so the row number doubles as
+    the `seq` used by ListingIndex and both produce the same ordering
+    and cursors. Strings are dictionary-encoded into int32 codes and
+    every search filter becomes one vectorized boolean mask.
+    """
+
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar listing store")
+        self._size = 0
+        self._row: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._codes: Dict[str, Dict[object, int]] = {f: {} for f in CODED_FIELDS}
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        self._capacity = capacity
+        self.bhk = np.full(capacity, -1, dtype=np.int32)
+        self.price = np.zeros(capacity, dtype=np.int64)
+        self.lat = np.full(capacity, np.nan, dtype=np.float64)
+        self.lng = np.full(capacity, np.nan, dtype=np.float64)
+        self.codes = {f: np.full(capacity, -1, dtype=np.int32) for f in CODED_FIELDS}
+
+    def _grow(self):
+        old = (self.bhk, self.price, self.lat, self.lng, self.codes)
+        self._alloc(self._capacity * 2)
+        n = self._size
+        self.bhk[:n] = old[0][:n]
+        self.price[:n] = old[1][:n]
+        self.lat[:n] = old[2][:n]
+        self.lng[:n] = old[3][:n]
+        for field in CODED_FIELDS:
+            self.codes[field][:n] = old[4][field][:n]
+
+    def _encode(self, field: str, value) -> int:
+        if value is None:
+            return -1
+        table = self._codes[field]
+        value = _key(value)
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    def __len__(self):
+        return self._size
+
+    def add(self, listing: dict):
+        listing_id = listing["id"]
+        row = self._row.get(listing_id)
+        if row is None:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._row[listing_id] = row
+            self._ids.append(listing_id)
+
+        bhk = listing.get("bhk")
+        lat = listing.get("lat")
+        lng = listing.get("lng")
+        self.bhk[row] = bhk if bhk is not None else -1
+        self.price[row] = effective_price(listing)
+        self.lat[row] = lat if lat is not None else np.nan
+        self.lng[row] = lng if lng is not None else np.nan
+        for field in CODED_FIELDS:
+            self.codes[field][row] = self._encode(field, listing.get(field))
+
+    def sort_key(self, listing_id: str, sort: Optional[str]) -> Tuple[int, ...]:
+        row = self._row[listing_id]
+        if sort == "price_low":
+            return (int(self.price[row]), row)
+        if sort == "price_high":
+            return (-int(self.price[row]), -row)
+        if sort == "newest":
+            return (-row,)
+        return (row,)
+
+    def mask(
+        self,
+        filters: dict,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+    ):
+        n = self._size
+        mask = np.ones(n, dtype=bool)
+
+        for field in CODED_FIELDS:
+            value = filters.get(field)
+            if value is None:
+                continue
+            code = self._codes[field].get(_key(value))
+            if code is None:
+                return np.zeros(n, dtype=bool)
+            mask &= self.codes[field][:n] == code
+
+        if filters.get("bhk") is not None:
+            mask &= self.bhk[:n] == filters["bhk"]
+        if filters.get("min_price") is not None:
+            mask &= self.price[:n] >= filters["min_price"]
+        if filters.get("max_price") is not None:
+            mask &= self.price[:n] <= filters["max_price"]
+
+        boxes = []
+        if bbox:
+            boxes.append(bbox)
+        if near:
+            # Cheap box prefilter so haversine only runs near the circle
+            boxes.append(radius_bbox(near[0], near[1], radius_km))
+        for min_lat, min_lng, max_lat, max_lng in boxes:
+            lat = self.lat[:n]
+            lng = self.lng[:n]
+            mask &= (lat >= min_lat) & (lat <= max_lat)
+            mask &= (lng >= min_lng) & (lng <= max_lng)
+
+        if near:
+            rows = np.flatnonzero(mask)
+            lat1 = np.radians(near[0])
+            lat2 = np.radians(self.lat[rows])
+            dlat = lat2 - lat1
+            dlng = np.radians(self.lng[rows] - near[1])
+            a = (
+                np.sin(dlat / 2) ** 2
+                + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+            )
+            dist = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+            mask[rows[~(dist <= radius_km)]] = False
+
+        return mask
+
+    def page(
+        self,
+        filters: dict,
+        sort: Optional[str] = None,
+        after: Optional[tuple] = None,
+        limit: int = 10,
+        skip: int = 0,
+        near: Optional[Tuple[float, float]] = None,
+        radius_km: Optional[float] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+    ) -> Tuple[List[str], bool]:
+        rows = np.flatnonzero(self.mask(filters, near, radius_km, bbox))
+        want = skip + limit + 1
+
+        if sort in ("price_low", "price_high"):
+            sign = 1 if sort == "price_low" else -1
+            primary = self.price[rows] * sign
+            secondary = rows * sign
+            if after:
+                keep = (primary > after[0]) | (
+                    (primary == after[0]) & (secondary > after[1])
+                )
+                rows, primary, secondary = rows[keep], primary[keep], secondary[keep]
+            if len(rows) > want:
+                # Keep every row tied with the cut-off so ties still
+                # resolve by secondary key
+                cutoff = np.partition(primary, want - 1)[want - 1]
+                top = primary <= cutoff
+                rows, primary, secondary = rows[top], primary[top], secondary[top]
+            rows = rows[np.lexsort((secondary, primary))]
+        elif sort == "newest":
+            if after:
+                rows = rows[rows < -after[0]]
+            rows = rows[::-1]
+        elif after:
+            rows = rows[rows > after[0]]
+
+        rows = rows[skip:want]
+        ids = [self._ids[r] for r in rows[:limit].tolist()]
+        return ids, len(rows) > limit
@@ -0,0 +1,92 @@
+from bisect import bisect_right
+from typing import Dict, Iterable, Optional, Set
+
+from modules.listings.indexes import _key, effective_price
+
+FACET_FIELDS = ("city", "bhk", "price")
+
+# Rents and sale prices need different bucket edges
+RENT_PRICE_EDGES = [10_000, 20_000, 35_000, 50_000, 100_000]
+SALE_PRICE_EDGES = [25_00_000, 50_00_000, 1_00_00_000, 2_00_00_000, 5_00_00_000]
+
+
+def price_bucket(listing: dict) -> Optional[str]:
+    price = effective_price(listing)
+    if not price:
+        return None
+    edges = SALE_PRICE_EDGES if _key(listing.get("listing_type")) == "BUY" else RENT_PRICE_EDGES
+    pos = bisect_right(edges, price)
+    low = edges[pos - 1] if pos else 0
+    if pos == len(edges):
+        return f"{low}+"
+    return f"{low}-{edges[pos]}"
+
+
+def _intersection_size(a: Set[str], b: Set[str]) -> int:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(1 for i in a if i in b)
+
+
+class FacetCounts:
+    """
+    Published-listing counts per city, bhk and price bucket.
+
+    Each facet value keeps the set of published ids carrying it, so
+    the unfiltered count is just the set size and a filtered count is
+    an intersection with the filtered candidates.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, Dict[object, Set[str]]] = {
+            field: {} for field in FACET_FIELDS
+        }
+        self._values: Dict[str, dict] = {}
+
+    def update(self, listing: dict, published: bool):
+        self.discard(listing["id"])
+        if published:
+            self._add(listing)
+
+    def load(self, listings: Iterable[dict]):
+        for listing in listings:
+            if _key(listing.get("status")) == "PUBLISHED":
+                self._add(listing)
+
+    def _add(self, listing: dict):
+        listing_id = listing["id"]
+        values = {
+            "city": _key(listing.get("city")),
+            "bhk": listing.get("bhk"),
+            "price": price_bucket(listing),
+        }
+        self._values[listing_id] = values
+        for field, value in values.items():
+            if value is not None:
+                self._buckets[field].setdefault(value, set()).add(listing_id)
+
+    def discard(self, listing_id: str):
+        values = self._values.pop(listing_id, None)
+        if values is None:
+            return
+        for field, value in values.items():
+            bucket = self._buckets[field].get(value)
+            if bucket is None:
+                continue
+            bucket.discard(listing_id)
+            if not bucket:
+                del self._buckets[field][value]
+
+    def counts(self, field: str, within: Optional[Set[str]] = None) -> Dict[str, int]:
+        """
+        Counts per value of `field`, restricted to `within` when given.
+        """
+        buckets = self._buckets[field]
+        if within is None:
+            counts = {str(value): len(ids) for value, ids in buckets.items()}
+        else:
+            counts = {
+                str(value): _intersection_size(ids, within)
+                for value, ids in buckets.items()
+            }
+        return {value: n for value, n in counts.items() if n}
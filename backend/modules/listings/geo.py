@@ -0,0 +1,134 @@
+import math
+from typing import Dict, Optional, Set, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+# ~1.1 km at the equator; a city-sized map viewport spans a few
+# thousand cells at most
+GRID_CELL_DEG = 0.01
+
+Cell = Tuple[int, int]
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = (
+        math.sin(dphi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_bbox(lat: float, lng: float, radius_km: float):
+    """
+    Smallest lat/lng box containing the circle, as
+    (min_lat, min_lng, max_lat, max_lng).
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-9:
+        dlng = 180.0
+    else:
+        dlng = min(180.0, dlat / cos_lat)
+    return (
+        max(-90.0, lat - dlat),
+        max(-180.0, lng - dlng),
+        min(90.0, lat + dlat),
+        min(180.0, lng + dlng),
+    )
+
+
+class GeoGrid:
+    """
+    Fixed-size lat/lng grid over listing coordinates.
+
+    Each listing sits in exactly one cell, so a bounding box query only
+    visits the cells it overlaps and a radius query adds an exact
+    haversine check on the survivors of its enclosing box.
+    """
+
+    def __init__(self, cell_deg: float = GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        self._cells: Dict[Cell, Set[str]] = {}
+        self._points: Dict[str, Tuple[float, float]] = {}
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return (
+            math.floor(lat / self.cell_deg),
+            math.floor(lng / self.cell_deg),
+        )
+
+    def add(self, listing_id: str, lat: Optional[float], lng: Optional[float]):
+        self.discard(listing_id)
+        if lat is None or lng is None:
+            return
+        self._points[listing_id] = (lat, lng)
+        self._cells.setdefault(self._cell(lat, lng), set()).add(listing_id)
+
+    def discard(self, listing_id: str):
+        point = self._points.pop(listing_id, None)
+        if point is None:
+            return
+        cell = self._cell(*point)
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(listing_id)
+            if not bucket:
+                del self._cells[cell]
+
+    def point_of(self, listing_id: str) -> Optional[Tuple[float, float]]:
+        return self._points.get(listing_id)
+
+    def ids_in_bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+    ) -> Set[str]:
+        lo_row, lo_col = self._cell(min_lat, min_lng)
+        hi_row, hi_col = self._cell(max_lat, max_lng)
+
+        if hi_row < lo_row or hi_col < lo_col:
+            return set()
+
+        # Very wide boxes would touch more empty cells than there are
+        # occupied ones, so walk the occupied cells instead
+        span = (hi_row - lo_row + 1) * (hi_col - lo_col + 1)
+        if span > len(self._cells):
+            cells = [
+                (cell, bucket) for cell, bucket in self._cells.items()
+                if lo_row <= cell[0] <= hi_row and lo_col <= cell[1] <= hi_col
+            ]
+        else:
+            cells = [
+                ((row, col), self._cells[(row, col)])
+                for row in range(lo_row, hi_row + 1)
+                for col in range(lo_col, hi_col + 1)
+                if (row, col) in self._cells
+            ]
+
+        result: Set[str] = set()
+        for (row, col), bucket in cells:
+            interior = (
+                lo_row < row < hi_row and lo_col < col < hi_col
+            )
+            if interior:
+                result |= bucket
+                continue
+            # Edge cells straddle the box boundary
+            for listing_id in bucket:
+                lat, lng = self._points[listing_id]
+                if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng:
+                    result.add(listing_id)
+        return result
+
+    def ids_within(self, lat: float, lng: float, radius_km: float) -> Set[str]:
+        boxed = self.ids_in_bbox(*radius_bbox(lat, lng, radius_km))
+        return {
+            listing_id for listing_id in boxed
+            if haversine_km(lat, lng, *self._points[listing_id]) <= radius_km
+        }
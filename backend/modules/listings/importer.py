@@ -0,0 +1,203 @@
+import codecs
+import csv
+import json
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from modules.listings.schemas import ListingCreate
+from modules.listings import service
+
+# CSV rows carry media as "url1|url2|..."; the first url is the cover
+CSV_MEDIA_COLUMN = "media_urls"
+CSV_MEDIA_SEPARATOR = "|"
+
+# Rows handed to the threadpool at a time; the service calls are sync
+IMPORT_BATCH_ROWS = 200
+
+# Request bodies larger than this are spooled to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+SPOOL_READ_BYTES = 64 * 1024
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def _ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[dict]:
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield {"__error__": "Invalid JSON"}
+            continue
+        if not isinstance(row, dict):
+            yield {"__error__": "Each line must be a JSON object"}
+            continue
+        yield row
+
+
+def _csv_row(header, values) -> dict:
+    if len(values) != len(header):
+        return {"__error__": f"Expected {len(header)} columns, got {len(values)}"}
+
+    row: Dict[str, object] = {
+        column: value for column, value in zip(header, values) if value != ""
+    }
+    urls = row.pop(CSV_MEDIA_COLUMN, None)
+    if urls:
+        row["media"] = [
+            {"url": url.strip(), "order": i, "is_cover": i == 0}
+            for i, url in enumerate(urls.split(CSV_MEDIA_SEPARATOR))
+            if url.strip()
+        ]
+    return row
+
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[dict]:
+    header = None
+    record = ""
+    async for line in lines:
+        # A quoted field may contain newlines; keep reading until the
+        # quotes balance out
+        record = f"{record}\n{line}" if record else line
+        if record.count('"') % 2:
+            continue
+        if not record.strip():
+            record = ""
+            continue
+
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [column.strip() for column in values]
+            continue
+        yield _csv_row(header, values)
+
+    if record:
+        yield {"__error__": "Unterminated quoted field"}
+
+
+def _import_row(row: dict, publish: bool) -> dict:
+    error = row.get("__error__")
+    if error:
+        return {"error": error}
+
+    try:
+        payload = ListingCreate.model_validate(row)
+    except ValidationError as e:
+        return {"error": e.errors(include_url=False, include_input=False)}
+
+    data = payload.model_dump(exclude_unset=True)
+    if publish:
+        # Reject before creating anything so invalid rows leave no drafts
+        valid, error = service.validate_before_publish(data)
+        if not valid:
+            return {"error": error}
+
+    listing = service.create_listing()
+    service.update_listing(listing["id"], data)
+
+    result = {"id": listing["id"], "published": False}
+    if publish:
+        _, error = service.publish_listing(listing["id"])
+        if error:
+            result["error"] = error
+        else:
+            result["published"] = True
+    return result
+
+
+def _import_batch(rows: List[dict], publish: bool, first_row: int) -> Tuple[str, int]:
+    """
+    (NDJSON result lines, rows created) for one batch.
+    """
+    lines = []
+    created = 0
+    for row_number, row in enumerate(rows, first_row):
+        result = _import_row(row, publish)
+        if "id" in result and not result.get("error"):
+            created += 1
+        lines.append(json.dumps({"row": row_number, **result}, default=str) + "\n")
+    return "".join(lines), created
+
+
+async def _batches(rows: AsyncIterator[dict], size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def import_listings(
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    publish: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Creates one listing per NDJSON line / CSV row and yields the NDJSON
+    result lines of each batch of IMPORT_BATCH_ROWS rows as soon as the
+    threadpool has imported it, then a summary line. Only one batch is
+    held in memory.
+    """
+    parse = _csv_rows if fmt == "csv" else _ndjson_rows
+
+    rows = created = 0
+    async for batch in _batches(parse(_lines(chunks)), IMPORT_BATCH_ROWS):
+        lines, ok = await run_in_threadpool(_import_batch, batch, publish, rows + 1)
+        rows += len(batch)
+        created += ok
+        yield lines
+
+    yield json.dumps({"summary": {"rows": rows, "ok": created, "failed": rows - created}}) + "\n"
+
+
+async def spool_body(chunks: AsyncIterator[bytes]) -> SpooledTemporaryFile:
+    """
+    Receives the whole request body into a temp file (in memory up to
+    SPOOL_MAX_MEMORY). The body has to be read before the response
+    starts: while a StreamingResponse runs, Starlette listens for
+    disconnects on the same receive channel and would take body chunks.
+    """
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        async for chunk in chunks:
+            await run_in_threadpool(spool.write, chunk)
+        await run_in_threadpool(spool.seek, 0)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+async def read_spool(spool: SpooledTemporaryFile) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await run_in_threadpool(spool.read, SPOOL_READ_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+def detect_format(fmt: Optional[str], content_type: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    if content_type and "csv" in content_type:
+        return "csv"
+    return "ndjson"
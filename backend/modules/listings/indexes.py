@@ -0,0 +1,396 @@
+from bisect import bisect_left, bisect_right, insort
+from enum import Enum
+from heapq import merge
+from itertools import count
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+HASH_FIELDS = ("status", "listing_type", "city", "bhk")
+
+# A filter bucket (or geo restriction) at most this fraction of the
+# store is sorted directly instead of walking the global sort order
+POOL_RATIO = 0.125
+
+PriceEntry = Tuple[int, int, str]
+
+
+def _key(value):
+    # Enum members and their raw values must land in the same bucket
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def effective_price(listing: dict) -> int:
+    return listing.get("rent_monthly") or listing.get("sale_price") or 0
+
+
+class ListingIndex:
+    """
+    Secondary indexes over the in-memory listing store.
+
+    Hash indexes map field value -> set of listing ids for the
+    equality filters, and sorted (price, seq, id) lists answer price
+    ranges with bisect. `seq` is the creation order, which is what the
+    unindexed search returned results in.
+
+    Price lists are kept per listing_type: rents and sale prices live
+    on different scales, so a single list would make a BUY search
+    sorted by price walk past every rental first.
+
+    Pages are produced by seeking to a sort key in one of the ordered
+    structures (`_order` by seq, `_by_price` by price) and walking
+    forward until `limit` matches are found.
+    """
+
+    def __init__(self):
+        self._hash: Dict[str, Dict[object, Set[str]]] = {
+            field: {} for field in HASH_FIELDS
+        }
+        self._by_price: Dict[object, List[PriceEntry]] = {}
+        self._keys: Dict[str, dict] = {}
+        self._seq: Dict[str, int] = {}
+        self._order: List[str] = []
+        self._counter = count()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, listing: dict):
+        listing_id = listing["id"]
+        self.discard(listing_id)
+
+        if listing_id not in self._seq:
+            self._seq[listing_id] = next(self._counter)
+            self._order.append(listing_id)
+        seq = self._seq[listing_id]
+
+        keys = {field: _key(listing.get(field)) for field in HASH_FIELDS}
+        keys["price"] = effective_price(listing)
+        self._keys[listing_id] = keys
+
+        for field in HASH_FIELDS:
+            self._hash[field].setdefault(keys[field], set()).add(listing_id)
+
+        prices = self._by_price.setdefault(keys["listing_type"], [])
+        insort(prices, (keys["price"], seq, listing_id))
+
+    def load(self, listings: Iterable[dict]):
+        """
+        Bulk variant of add() for an empty index: appends everything
+        and sorts the price lists once instead of an insort per listing.
+        """
+        if self._keys:
+            for listing in listings:
+                self.add(listing)
+            return
+
+        hashes = [(field, self._hash[field]) for field in HASH_FIELDS]
+        for listing in listings:
+            listing_id = listing["id"]
+            seq = next(self._counter)
+            self._seq[listing_id] = seq
+            self._order.append(listing_id)
+
+            keys = {field: _key(listing.get(field)) for field in HASH_FIELDS}
+            keys["price"] = price = effective_price(listing)
+            self._keys[listing_id] = keys
+
+            for field, buckets in hashes:
+                bucket = buckets.get(keys[field])
+                if bucket is None:
+                    bucket = buckets[keys[field]] = set()
+                bucket.add(listing_id)
+
+            prices = self._by_price.get(keys["listing_type"])
+            if prices is None:
+                prices = self._by_price[keys["listing_type"]] = []
+            prices.append((price, seq, listing_id))
+
+        for prices in self._by_price.values():
+            prices.sort()
+
+    def discard(self, listing_id: str):
+        keys = self._keys.pop(listing_id, None)
+        if keys is None:
+            return
+
+        for field in HASH_FIELDS:
+            bucket = self._hash[field].get(keys[field])
+            if bucket is None:
+                continue
+            bucket.discard(listing_id)
+            if not bucket:
+                del self._hash[field][keys[field]]
+
+        prices = self._by_price.get(keys["listing_type"], [])
+        entry = (keys["price"], self._seq[listing_id], listing_id)
+        pos = bisect_left(prices, entry)
+        if pos < len(prices) and prices[pos] == entry:
+            del prices[pos]
+        if not prices:
+            self._by_price.pop(keys["listing_type"], None)
+
+    def seq_of(self, listing_id: str) -> int:
+        return self._seq[listing_id]
+
+    def price_of(self, listing_id: str) -> int:
+        return self._keys[listing_id]["price"]
+
+    def ids_with(self, field: str, value) -> Set[str]:
+        # A copy: searches run outside the store lock while writers
+        # add to and discard from the live bucket
+        return set(self._hash[field].get(_key(value), ()))
+
+    def _price_lists(self, listing_type=None) -> List[List[PriceEntry]]:
+        if listing_type is None:
+            return list(self._by_price.values())
+        prices = self._by_price.get(_key(listing_type))
+        return [prices] if prices else []
+
+    @staticmethod
+    def _price_bounds(
+        prices: List[PriceEntry],
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> Tuple[int, int]:
+        lo = 0
+        hi = len(prices)
+        if min_price is not None:
+            lo = bisect_left(prices, (min_price,))
+        if max_price is not None:
+            hi = bisect_right(prices, (max_price, float("inf")))
+        return lo, max(lo, hi)
+
+    def ids_in_price_range(
+        self,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        listing_type=None,
+    ) -> List[str]:
+        ids = []
+        for prices in self._price_lists(listing_type):
+            lo, hi = self._price_bounds(prices, min_price, max_price)
+            ids.extend(listing_id for _, _, listing_id in prices[lo:hi])
+        return ids
+
+    def candidates(
+        self,
+        status=None,
+        listing_type=None,
+        city=None,
+        bhk=None,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+    ) -> Set[str]:
+        """
+        Returns the ids matching every given filter. Hash buckets are
+        intersected smallest first; the price range is either walked
+        from the sorted index or checked per candidate, whichever is
+        smaller.
+        """
+        wanted = {
+            "status": status,
+            "listing_type": listing_type,
+            "city": city,
+            "bhk": bhk,
+        }
+        buckets = [
+            self.ids_with(field, value)
+            for field, value in wanted.items()
+            if value is not None
+        ]
+
+        has_price = min_price is not None or max_price is not None
+
+        if not buckets:
+            if has_price:
+                return set(self.ids_in_price_range(min_price, max_price))
+            return set(self._keys)
+
+        buckets.sort(key=len)
+        result = buckets[0]
+        for bucket in buckets[1:]:
+            if not result:
+                break
+            result &= bucket
+
+        if has_price and result:
+            ranges = [
+                (prices, *self._price_bounds(prices, min_price, max_price))
+                for prices in self._price_lists(listing_type)
+            ]
+            if sum(hi - lo for _, lo, hi in ranges) < len(result):
+                result = {
+                    listing_id
+                    for prices, lo, hi in ranges
+                    for _, _, listing_id in prices[lo:hi]
+                    if listing_id in result
+                }
+            else:
+                low = min_price if min_price is not None else float("-inf")
+                high = max_price if max_price is not None else float("inf")
+                result = {
+                    listing_id for listing_id in result
+                    if low <= self._keys[listing_id]["price"] <= high
+                }
+
+        return result
+
+    def sort_key(
+        self,
+        listing_id: str,
+        sort: Optional[str],
+        scores: Optional[Dict[str, float]] = None,
+    ) -> tuple:
+        seq = self._seq[listing_id]
+        if sort == "relevance":
+            return (-scores.get(listing_id, 0.0), seq)
+        if sort == "price_low":
+            return (self._keys[listing_id]["price"], seq)
+        if sort == "price_high":
+            return (-self._keys[listing_id]["price"], -seq)
+        if sort == "newest":
+            return (-seq,)
+        return (seq,)
+
+    def matches(
+        self,
+        listing_id: str,
+        filters: dict,
+        restrict: Optional[Set[str]] = None,
+    ) -> bool:
+        keys = self._keys.get(listing_id)
+        if keys is None:
+            return False
+        if restrict is not None and listing_id not in restrict:
+            return False
+        for field in HASH_FIELDS:
+            value = filters.get(field)
+            if value is not None and keys[field] != _key(value):
+                return False
+        min_price = filters.get("min_price")
+        if min_price is not None and keys["price"] < min_price:
+            return False
+        max_price = filters.get("max_price")
+        if max_price is not None and keys["price"] > max_price:
+            return False
+        return True
+
+    @staticmethod
+    def _ascending(prices: List[PriceEntry], start: int) -> Iterator[PriceEntry]:
+        for pos in range(start, len(prices)):
+            yield prices[pos]
+
+    @staticmethod
+    def _descending(prices: List[PriceEntry], stop: int) -> Iterator[PriceEntry]:
+        for pos in range(stop - 1, -1, -1):
+            yield prices[pos]
+
+    def _walk(
+        self,
+        sort: Optional[str],
+        after: Optional[tuple],
+        listing_type=None,
+    ) -> Iterator[str]:
+        if sort == "price_low":
+            walks = [
+                self._ascending(
+                    prices,
+                    bisect_left(prices, (after[0], after[1] + 1)) if after else 0,
+                )
+                for prices in self._price_lists(listing_type)
+            ]
+            for entry in merge(*walks):
+                yield entry[2]
+        elif sort == "price_high":
+            walks = [
+                self._descending(
+                    prices,
+                    bisect_left(prices, (-after[0], -after[1])) if after else len(prices),
+                )
+                for prices in self._price_lists(listing_type)
+            ]
+            for entry in merge(*walks, reverse=True):
+                yield entry[2]
+        elif sort == "newest":
+            start = -after[0] - 1 if after else len(self._order) - 1
+            start = min(start, len(self._order) - 1)
+            for seq in range(start, -1, -1):
+                yield self._order[seq]
+        else:
+            start = max(after[0] + 1, 0) if after else 0
+            for seq in range(start, len(self._order)):
+                yield self._order[seq]
+
+    def _walk_pool(
+        self,
+        pool: Set[str],
+        sort: Optional[str],
+        after: Optional[tuple],
+        scores: Optional[Dict[str, float]] = None,
+    ) -> Iterator[str]:
+        ordered = sorted(pool, key=lambda i: self.sort_key(i, sort, scores))
+        start = 0
+        if after:
+            keys = [self.sort_key(i, sort, scores) for i in ordered]
+            start = bisect_right(keys, tuple(after))
+        return iter(ordered[start:])
+
+    def page(
+        self,
+        filters: dict,
+        sort: Optional[str] = None,
+        after: Optional[tuple] = None,
+        limit: int = 10,
+        skip: int = 0,
+        restrict: Optional[Set[str]] = None,
+        scores: Optional[Dict[str, float]] = None,
+    ) -> Tuple[List[str], bool]:
+        """
+        Returns up to `limit` matching ids that sort strictly after the
+        `after` key, plus whether more matches follow.
+
+        sort="relevance" orders by `scores` and only considers the
+        scored ids, so there is no global order to walk.
+        """
+        if sort == "relevance":
+            pool = set(scores) if restrict is None else restrict & scores.keys()
+            walk = self._walk_pool(pool, sort, after, scores)
+            return self._collect(walk, filters, restrict, limit, skip)
+
+        pools = [
+            self.ids_with(field, filters[field])
+            for field in HASH_FIELDS
+            if field != "status" and filters.get(field) is not None
+        ]
+        if restrict is not None:
+            pools.append(restrict)
+        pool = min(pools, key=len) if pools else None
+
+        if pool is not None and len(pool) <= len(self._keys) * POOL_RATIO:
+            walk = self._walk_pool(pool, sort, after)
+        else:
+            walk = self._walk(sort, after, filters.get("listing_type"))
+
+        return self._collect(walk, filters, restrict, limit, skip)
+
+    def _collect(
+        self,
+        walk: Iterator[str],
+        filters: dict,
+        restrict: Optional[Set[str]],
+        limit: int,
+        skip: int,
+    ) -> Tuple[List[str], bool]:
+        ids: List[str] = []
+        for listing_id in walk:
+            if not self.matches(listing_id, filters, restrict):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            if len(ids) == limit:
+                return ids, True
+            ids.append(listing_id)
+        return ids, False
@@ -0,0 +1,224 @@
+import gc
+import os
+import pickle
+import struct
+import zlib
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_FILE = "listings.snapshot"
+WAL_FILE = "listings.wal"
+# The WAL a snapshot in progress covers; removed once the snapshot is in place
+PREV_WAL_FILE = "listings.wal.prev"
+
+SNAPSHOT_MAGIC = b"IMLS"
+WAL_MAGIC = b"IMLW"
+# Both files start with their magic and one format version byte
+FORMAT_VERSION = 1
+# Pinned so files stay readable across Python upgrades. The files are
+# only ever written by this process, never taken from clients.
+PICKLE_PROTOCOL = 4
+
+# WAL record: payload length, crc32 of payload, pickled payload
+_RECORD_HEADER = struct.Struct("<II")
+
+
+def _plain(listing: dict) -> dict:
+    # Only builtin types are stored; status / listing_type enums are
+    # stored by value (nested media items are already plain dicts)
+    return {
+        k: v.value if isinstance(v, Enum) else v
+        for k, v in listing.items()
+    }
+
+
+def capture(listings: Dict[str, dict]) -> List[dict]:
+    """
+    Copies of `listings` in creation order, for write_snapshot(). The
+    copies are shallow: updates replace top-level values, they do not
+    mutate nested ones.
+    """
+    return [_plain(listing) for listing in listings.values()]
+
+
+@contextmanager
+def gc_paused():
+    """
+    Loading a million listings allocates millions of containers, which
+    keeps triggering full cyclic GC passes over everything already
+    loaded. None of it is cyclic garbage, so pause the collector.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class ListingLog:
+    """
+    Write-ahead log plus compact snapshot for the in-memory listings.
+
+    Every mutation appends the listing's full state as one WAL record,
+    so replay is idempotent and a torn tail record is simply dropped.
+
+    A snapshot is taken in two steps so only the first has to block
+    writers: `rotate()` sets the current WAL aside as the previous one,
+    then `write_snapshot()` writes all listings in creation order to a
+    temp file, renames it into place and deletes the previous WAL.
+    `snapshot()` does both. Only one snapshot may be in progress.
+
+    A snapshot may also carry derived index state that is expensive to
+    rebuild; it describes the listings as of the snapshot, before any
+    WAL records.
+    """
+
+    def __init__(self, directory, fsync: bool = False):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.records = 0
+        self._wal = None
+
+    @property
+    def snapshot_path(self) -> Path:
+        return self.directory / SNAPSHOT_FILE
+
+    @property
+    def wal_path(self) -> Path:
+        return self.directory / WAL_FILE
+
+    @property
+    def prev_wal_path(self) -> Path:
+        return self.directory / PREV_WAL_FILE
+
+    def _open_wal(self):
+        if self._wal is None:
+            self._wal = open(self.wal_path, "ab")
+            if self._wal.tell() == 0:
+                self._wal.write(WAL_MAGIC + bytes([FORMAT_VERSION]))
+        return self._wal
+
+    def append(self, listing: dict):
+        payload = pickle.dumps(_plain(listing), protocol=PICKLE_PROTOCOL)
+        wal = self._open_wal()
+        wal.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+        wal.write(payload)
+        wal.flush()
+        if self.fsync:
+            os.fsync(wal.fileno())
+        self.records += 1
+
+    def _read_snapshot(self) -> dict:
+        if not self.snapshot_path.exists():
+            return {"listings": [], "indexes": {}}
+        with open(self.snapshot_path, "rb") as f:
+            magic = f.read(len(SNAPSHOT_MAGIC))
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{self.snapshot_path} is not a listing snapshot")
+            if f.read(1) != bytes([FORMAT_VERSION]):
+                raise ValueError(f"Unsupported listing snapshot version in {self.snapshot_path}")
+            # One read + loads() beats load() on the file object
+            return pickle.loads(f.read())
+
+    def _read_wal(self, path: Path) -> Iterator[dict]:
+        if not path.exists():
+            return
+        good = 0
+        with open(path, "rb") as f:
+            header = f.read(len(WAL_MAGIC) + 1)
+            if len(header) == len(WAL_MAGIC) + 1:
+                if header != WAL_MAGIC + bytes([FORMAT_VERSION]):
+                    raise ValueError(f"{path} is not a version {FORMAT_VERSION} listing WAL")
+                good = f.tell()
+            # else: torn while the header was written; truncated below
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                length, crc = _RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                good = f.tell()
+                self.records += 1
+                yield pickle.loads(payload)
+
+        # Drop a torn tail so new records are not appended after garbage
+        if good < path.stat().st_size:
+            with open(path, "r+b") as f:
+                f.truncate(good)
+
+    def load(self) -> Tuple[Dict[str, dict], dict, List[str]]:
+        """
+        Returns (listings, indexes, replayed): listings in creation order
+        with the previous and current WAL applied on top of the snapshot,
+        the snapshot's index state, and the ids whose WAL records came
+        after it.
+        """
+        self.records = 0
+        with gc_paused():
+            snapshot = self._read_snapshot()
+            listings = {listing["id"]: listing for listing in snapshot["listings"]}
+            replayed = []
+            for path in (self.prev_wal_path, self.wal_path):
+                for listing in self._read_wal(path):
+                    listings[listing["id"]] = listing
+                    replayed.append(listing["id"])
+        return listings, snapshot["indexes"], replayed
+
+    def rotate(self):
+        """
+        Starts a new WAL; records so far stay replayable from the previous
+        one until write_snapshot() replaces them. If an earlier snapshot
+        failed, its previous WAL is still there and the current records
+        are added to it.
+        """
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        if self.wal_path.exists():
+            if self.prev_wal_path.exists():
+                with open(self.wal_path, "rb") as src, open(self.prev_wal_path, "ab") as dst:
+                    src.seek(len(WAL_MAGIC) + 1)
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                self.wal_path.unlink()
+            else:
+                os.replace(self.wal_path, self.prev_wal_path)
+        self.records = 0
+
+    def write_snapshot(self, listings: List[dict], indexes: Optional[dict] = None):
+        """
+        Writes `listings` (plain dicts, see capture()) as the snapshot.
+        They must include every record of the WAL set aside by rotate().
+        Touches nothing append() uses, so it may run on another thread.
+        """
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f, gc_paused():
+            f.write(SNAPSHOT_MAGIC + bytes([FORMAT_VERSION]))
+            f.write(pickle.dumps(
+                {"listings": listings, "indexes": indexes or {}},
+                protocol=PICKLE_PROTOCOL,
+            ))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+
+        # Replaying the previous WAL over the new snapshot would be
+        # harmless (records are full states), so a crash before this is safe
+        self.prev_wal_path.unlink(missing_ok=True)
+
+    def snapshot(self, listings: Dict[str, dict], indexes: Optional[dict] = None):
+        self.rotate()
+        self.write_snapshot(capture(listings), indexes)
+
+    def close(self):
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
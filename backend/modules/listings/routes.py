@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, Query, Depends
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Depends, Response, Header, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import List, Optional, Tuple, Union
 
-from modules.listings.schemas import ListingCreate, ListingResponse
+from modules.listings.schemas import (
+    ListingCreate,
+    ListingResponse,
+    ListingSearchWithFacets,
+    ListingSuggestion,
+)
 from modules.listings import service
+from modules.listings.importer import detect_format, import_listings, read_spool, spool_body
 
+from core import security
 try:
     from core.rbac import require_role
 except ImportError:
@@ -15,6 +24,9 @@ except ImportError:
 
 router = APIRouter(prefix="/listings", tags=["Listings"])
 
+# Clients may reuse a detail briefly, then revalidate with If-None-Match
+DETAIL_CACHE_CONTROL = "public, max-age=30, must-revalidate"
+
 @router.post(
     "/admin/listings",
     response_model=ListingResponse,
@@ -24,6 +36,24 @@ def admin_create_listing():
     return service.create_listing()
 
 
+@router.post(
+    "/admin/listings/import",
+    dependencies=[Depends(security.require_role(["admin"]))]
+)
+async def admin_import_listings(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    publish: bool = False,
+):
+    fmt = detect_format(format, request.headers.get("content-type"))
+    spool = await spool_body(request.stream())
+    return StreamingResponse(
+        import_listings(read_spool(spool), fmt, publish),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(spool.close),
+    )
+
+
 @router.patch(
     "/admin/listings/{listing_id}",
     response_model=ListingResponse,
@@ -61,32 +91,119 @@ def admin_unpublish_listing(listing_id: str):
     return {"unpublished": True}
 
 
-@router.get("", response_model=List[ListingResponse])
+def _parse_coords(raw: Optional[str], count: int, name: str) -> Optional[Tuple[float, ...]]:
+    if not raw:
+        return None
+    try:
+        values = tuple(float(v) for v in raw.split(","))
+    except ValueError:
+        values = ()
+    if len(values) != count:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name} must be {count} comma separated numbers"
+        )
+    return values
+
+
+@router.get("", response_model=Union[List[ListingResponse], ListingSearchWithFacets])
 def get_listings(
+    response: Response,
     type: Optional[str] = Query(None),
     city: Optional[str] = None,
     bhk: Optional[int] = None,
     minPrice: Optional[int] = None,
     maxPrice: Optional[int] = None,
     sort: Optional[str] = None,
-    page: int = 1,
-    limit: int = 10,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    near: Optional[str] = Query(None, description="lat,lng"),
+    radius_km: Optional[float] = Query(None, gt=0),
+    bbox: Optional[str] = Query(None, description="minLat,minLng,maxLat,maxLng"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    q: Optional[str] = Query(None, max_length=200),
+    facets: bool = False,
 ):
-    return service.search_public_listings(
+    filters = dict(
         listing_type=type,
         city=city,
         bhk=bhk,
         min_price=minPrice,
         max_price=maxPrice,
-        sort=sort,
-        page=page,
-        limit=limit,
+        near=_parse_coords(near, 2, "near"),
+        radius_km=radius_km,
+        bbox=_parse_coords(bbox, 4, "bbox"),
+        q=q,
     )
+    try:
+        listings, next_cursor = service.search_public_listings(
+            sort=sort,
+            page=page,
+            limit=limit,
+            cursor=cursor,
+            **filters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if facets:
+        return {"items": listings, "facets": service.search_facets(**filters)}
+    return listings
+
+
+# Completions change only when listings are published / unpublished
+SUGGEST_CACHE_CONTROL = "public, max-age=60"
+
+
+@router.get("/suggest", response_model=List[ListingSuggestion])
+def suggest_locations(
+    response: Response,
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=10),
+):
+    response.headers["Cache-Control"] = SUGGEST_CACHE_CONTROL
+    return service.suggest_locations(prefix, limit)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return etag in tags or f"W/{etag}" in tags
 
 
 @router.get("/{listing_id}", response_model=ListingResponse)
-def get_listing_detail(listing_id: str):
-    listing = service.get_listing_by_id(listing_id)
-    if not listing or listing["status"] != "PUBLISHED":
+def get_listing_detail(
+    listing_id: str,
+    if_none_match: Optional[str] = Header(None),
+):
+    detail = service.get_public_listing_detail(listing_id)
+    if not detail:
         raise HTTPException(status_code=404, detail="Listing not found")
-    return listing
+
+    etag, body = detail
+    headers = {"ETag": etag, "Cache-Control": DETAIL_CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Neighbour tables shift as nearby listings are published / unpublished
+SIMILAR_CACHE_CONTROL = "public, max-age=60"
+
+
+@router.get("/{listing_id}/similar", response_model=List[ListingResponse])
+def get_similar_listings(
+    listing_id: str,
+    response: Response,
+    limit: int = Query(10, ge=1, le=10),
+):
+    listings = service.similar_listings(listing_id, limit)
+    if listings is None:
+        raise HTTPException(status_code=404, detail="Listing not found")
+    response.headers["Cache-Control"] = SIMILAR_CACHE_CONTROL
+    return listings
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 
@@ -44,3 +44,21 @@ class ListingResponse(ListingCreate):
     id: str
     status: ListingStatus
     cover_image_url: Optional[str] = None
+
+
+class ListingFacets(BaseModel):
+    city: Dict[str, int] = {}
+    bhk: Dict[str, int] = {}
+    price: Dict[str, int] = {}
+
+
+class ListingSearchWithFacets(BaseModel):
+    items: List[ListingResponse]
+    facets: ListingFacets
+
+
+class ListingSuggestion(BaseModel):
+    type: str
+    value: str
+    city: Optional[str] = None
+    count: int
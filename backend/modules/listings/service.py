@@ -1,26 +1,227 @@
+import base64
+import hashlib
+import json
+import logging
+import threading
 import uuid
-from typing import Dict, List, Optional
-from modules.listings.schemas import ListingStatus
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+from core.config import (
+    LISTINGS_COLUMNAR,
+    LISTINGS_DATA_DIR,
+    LISTINGS_WAL_FSYNC,
+    LISTINGS_SNAPSHOT_EVERY,
+)
+from modules.listings.schemas import ListingStatus, ListingResponse
+from modules.listings.indexes import ListingIndex
+from modules.listings.geo import GeoGrid
+from modules.listings.columnar import ColumnarListings, np
+from modules.listings.text_index import TextIndex
+from modules.listings.facets import FacetCounts, FACET_FIELDS
+from modules.listings.suggest import SuggestIndex
+from modules.listings.similar import SimilarListings
+from modules.listings.persistence import ListingLog, capture, gc_paused
+from modules.media.images import generate_derivatives
+
+logger = logging.getLogger(__name__)
 
 # In-memory store
 _listings: Dict[str, dict] = {}
+_index = ListingIndex()
+_geo = GeoGrid()
+_text = TextIndex()
+_facets = FacetCounts()
+_suggest = SuggestIndex()
+_columns = ColumnarListings() if LISTINGS_COLUMNAR and np is not None else None
+_similar = SimilarListings() if np is not None else None
+
+# listing_id -> (version, etag, serialized ListingResponse)
+_detail_cache: Dict[str, Tuple[int, str, bytes]] = {}
+
+# Durable log, opened by open_store() at startup
+_log: Optional[ListingLog] = None
+
+# Held by mutations (request threads) and by snapshot capture, so a
+# snapshot sees every listing exactly as its WAL records left it
+_store_lock = threading.RLock()
+# Periodic snapshots are written here, off the request path
+_snapshot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="listing-snapshot")
+_snapshot_pending: Optional[Future] = None
+
+DEFAULT_RADIUS_KM = 5.0
+
+# Length of ListingIndex.sort_key() per sort; any other sort uses 1
+_CURSOR_KEY_LENGTHS = {"relevance": 2, "price_low": 2, "price_high": 2}
+
+
+def _encode_cursor(sort: Optional[str], key: tuple, listing_id: str) -> str:
+    raw = json.dumps([sort, list(key), listing_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: Optional[str]) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, _ = json.loads(base64.urlsafe_b64decode(padded))
+        key = tuple(key)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort:
+        raise ValueError("Cursor does not match sort")
+    if len(key) != _CURSOR_KEY_LENGTHS.get(sort, 1) or not all(
+        isinstance(k, (int, float)) and not isinstance(k, bool) for k in key
+    ):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _reindex(listing: dict):
+    _index.add(listing)
+    _geo.add(listing["id"], listing.get("lat"), listing.get("lng"))
+    _text.add(listing)
+    published = listing.get("status") == ListingStatus.PUBLISHED
+    _facets.update(listing, published)
+    _suggest.update(listing, published)
+    if _similar is not None:
+        _similar.update(listing, published)
+    if _columns is not None:
+        _columns.add(listing)
+
+
+def _persist(listing: dict):
+    global _snapshot_pending
+    if _log is None:
+        return
+    _log.append(listing)
+    if _log.records >= LISTINGS_SNAPSHOT_EVERY and (
+        _snapshot_pending is None or _snapshot_pending.done()
+    ):
+        _snapshot_pending = _snapshot_executor.submit(_background_snapshot, _log)
+
+
+def _capture(log: ListingLog) -> Tuple[List[dict], dict]:
+    # Copying is much cheaper than serializing, so writers only wait for this
+    with _store_lock:
+        log.rotate()
+        return capture(_listings), {"text": _text.export()}
+
+
+def _background_snapshot(log: ListingLog):
+    if log is not _log:
+        return
+    try:
+        log.write_snapshot(*_capture(log))
+    except Exception:
+        # Nothing is lost: the set-aside WAL stays until a snapshot succeeds
+        logger.exception("Listing snapshot failed")
+
+
+def _wait_for_snapshot():
+    if _snapshot_pending is not None:
+        _snapshot_pending.result()
+
+
+def _snapshot():
+    _wait_for_snapshot()
+    _log.write_snapshot(*_capture(_log))
+
+
+def _changed(listing: dict):
+    listing["version"] = listing.get("version", 0) + 1
+    _detail_cache.pop(listing["id"], None)
+    _reindex(listing)
+    _persist(listing)
+
+
+def _rebuild(
+    listings: Dict[str, dict],
+    indexes: Optional[dict] = None,
+    replayed: Optional[List[str]] = None,
+):
+    global _index, _geo, _text, _facets, _suggest, _similar, _columns
+
+    with gc_paused():
+        _listings.clear()
+        _listings.update(listings)
+        _detail_cache.clear()
+
+        _index = ListingIndex()
+        _index.load(_listings.values())
+        _text = TextIndex()
+        if indexes and "text" in indexes:
+            _text.restore(indexes["text"])
+            for listing_id in dict.fromkeys(replayed or []):
+                _text.add(_listings[listing_id])
+        else:
+            _text.load(_listings.values())
+        _facets = FacetCounts()
+        _facets.load(_listings.values())
+        _suggest = SuggestIndex()
+        _suggest.load(_listings.values())
+        if np is not None:
+            _similar = SimilarListings()
+            _similar.load(_listings.values())
+        _geo = GeoGrid()
+        _columns = ColumnarListings() if LISTINGS_COLUMNAR and np is not None else None
+        for listing in _listings.values():
+            _geo.add(listing["id"], listing.get("lat"), listing.get("lng"))
+            if _columns is not None:
+                _columns.add(listing)
+
+
+def open_store(directory: Optional[str] = LISTINGS_DATA_DIR):
+    """
+    Restores listings from the snapshot + WAL in `directory` and logs
+    every later mutation there. Replayed WAL records are compacted into
+    a fresh snapshot straight away.
+    """
+    global _log
+    if not directory:
+        return
+    _wait_for_snapshot()
+
+    log = ListingLog(directory, fsync=LISTINGS_WAL_FSYNC)
+    _rebuild(*log.load())
+    _log = log
+    if log.records:
+        _snapshot()
+
+
+def close_store():
+    global _log
+    if _log is None:
+        return
+    _snapshot()
+    _log.close()
+    _log = None
+
 
 def create_listing():
     listing_id = str(uuid.uuid4())
-    _listings[listing_id] = {
-        "id": listing_id,
-        "status": ListingStatus.DRAFT,
-        "media": []
-    }
+    with _store_lock:
+        _listings[listing_id] = {
+            "id": listing_id,
+            "status": ListingStatus.DRAFT,
+            "media": [],
+            "version": 1,
+        }
+        _reindex(_listings[listing_id])
+        _persist(_listings[listing_id])
     return _listings[listing_id]
 
 
 def update_listing(listing_id: str, payload: dict):
-    if listing_id not in _listings:
-        return None
+    with _store_lock:
+        if listing_id not in _listings:
+            return None
 
-    _listings[listing_id].update(payload)
+        _listings[listing_id].update(payload)
+        _changed(_listings[listing_id])
+    if payload.get("media"):
+        generate_derivatives(item["url"] for item in payload["media"])
     return _listings[listing_id]
+
+
 def validate_before_publish(listing: dict):
     required_fields = [
         "title",
@@ -73,8 +274,10 @@ def publish_listing(listing_id: str):
         return None, error
 
     cover = next((m["url"] for m in listing["media"] if m.get("is_cover")), None)
-    listing["cover_image_url"] = cover or listing["media"][0]["url"]
-    listing["status"] = ListingStatus.PUBLISHED
+    with _store_lock:
+        listing["cover_image_url"] = cover or listing["media"][0]["url"]
+        listing["status"] = ListingStatus.PUBLISHED
+        _changed(listing)
 
     return listing, None
 
@@ -83,9 +286,38 @@ def unpublish_listing(listing_id: str):
     listing = _listings.get(listing_id)
     if not listing:
         return None
-    listing["status"] = ListingStatus.DRAFT
+    with _store_lock:
+        listing["status"] = ListingStatus.DRAFT
+        _changed(listing)
     return listing
 
+def _search_filters(listing_type, city, bhk, min_price, max_price) -> dict:
+    return {
+        "status": ListingStatus.PUBLISHED,
+        "listing_type": listing_type or None,
+        "city": city or None,
+        "bhk": bhk or None,
+        "min_price": min_price or None,
+        "max_price": max_price or None,
+    }
+
+
+def _restrict(
+    scores: Optional[Dict[str, float]],
+    near: Optional[Tuple[float, float]],
+    radius_km: Optional[float],
+    bbox: Optional[Tuple[float, float, float, float]],
+) -> Optional[Set[str]]:
+    restrict = set(scores) if scores is not None else None
+    if near:
+        within = _geo.ids_within(near[0], near[1], radius_km or DEFAULT_RADIUS_KM)
+        restrict = within if restrict is None else restrict & within
+    if bbox:
+        box = _geo.ids_in_bbox(*bbox)
+        restrict = box if restrict is None else restrict & box
+    return restrict
+
+
 def search_public_listings(
     listing_type: Optional[str] = None,
     city: Optional[str] = None,
@@ -95,47 +327,162 @@ def search_public_listings(
     sort: Optional[str] = None,
     page: int = 1,
     limit: int = 10,
+    near: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
 ):
-    results = [
-        l for l in _listings.values()
-        if l.get("status") == ListingStatus.PUBLISHED
-    ]
+    """
+    Returns (page, next_cursor). With a cursor the page is found by
+    seeking past the cursor's sort key; `page` is only used without one.
+    A free text `q` restricts results to matching listings and, unless
+    another sort is requested, orders them by relevance; without one,
+    sort="relevance" falls back to the default order.
+    """
+    filters = _search_filters(listing_type, city, bhk, min_price, max_price)
+
+    scores = None
+    if q and q.strip():
+        scores = _text.search(q)
+        sort = sort or "relevance"
+    elif sort == "relevance":
+        # Nothing to rank by; use the default order
+        sort = None
+
+    after = _decode_cursor(cursor, sort) if cursor else None
+    skip = 0 if after else (page - 1) * limit
 
-    if listing_type:
-        results = [l for l in results if l.get("listing_type") == listing_type]
-
-    if city:
-        results = [l for l in results if l.get("city") == city]
-
-    if bhk:
-        results = [l for l in results if l.get("bhk") == bhk]
-
-    if min_price:
-        results = [
-            l for l in results
-            if (l.get("rent_monthly") or l.get("sale_price", 0)) >= min_price
-        ]
-
-    if max_price:
-        results = [
-            l for l in results
-            if (l.get("rent_monthly") or l.get("sale_price", 0)) <= max_price
-        ]
-
-    if sort == "newest":
-        results = list(reversed(results))
-    elif sort == "price_low":
-        results.sort(key=lambda x: x.get("rent_monthly") or x.get("sale_price", 0))
-    elif sort == "price_high":
-        results.sort(
-            key=lambda x: x.get("rent_monthly") or x.get("sale_price", 0),
-            reverse=True
+    if _columns is not None and scores is None:
+        ids, has_more = _columns.page(
+            filters,
+            sort=sort,
+            after=after,
+            limit=limit,
+            skip=skip,
+            near=near,
+            radius_km=radius_km or DEFAULT_RADIUS_KM,
+            bbox=bbox,
         )
+        return _page_result(ids, has_more, sort)
 
-    start = (page - 1) * limit
-    end = start + limit
-    return results[start:end]
+    restrict = _restrict(scores, near, radius_km, bbox)
+    ids, has_more = _index.page(
+        filters,
+        sort=sort,
+        after=after,
+        limit=limit,
+        skip=skip,
+        restrict=restrict,
+        scores=scores,
+    )
+    return _page_result(ids, has_more, sort, scores)
+
+
+def _page_result(
+    ids: List[str],
+    has_more: bool,
+    sort: Optional[str],
+    scores: Optional[Dict[str, float]] = None,
+):
+    next_cursor = None
+    if has_more and ids:
+        last = ids[-1]
+        key = _index.sort_key(last, sort, scores)
+        next_cursor = _encode_cursor(sort, key, last)
+    return [_listings[i] for i in ids], next_cursor
+
+
+# Filters that a facet ignores when counting its own values, so picking
+# one city still shows how many listings the other cities have
+_FACET_OWN_FILTERS = {
+    "city": ("city",),
+    "bhk": ("bhk",),
+    "price": ("min_price", "max_price"),
+}
+
+
+def search_facets(
+    listing_type: Optional[str] = None,
+    city: Optional[str] = None,
+    bhk: Optional[int] = None,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    near: Optional[Tuple[float, float]] = None,
+    radius_km: Optional[float] = None,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    q: Optional[str] = None,
+):
+    """
+    Published-listing counts per city, bhk and price bucket under the
+    active filters. Without other filters the maintained counters are
+    returned as-is; otherwise each facet bucket is intersected with the
+    indexed candidates.
+    """
+    filters = _search_filters(listing_type, city, bhk, min_price, max_price)
+    scores = _text.search(q) if q and q.strip() else None
+    restrict = _restrict(scores, near, radius_km, bbox)
+
+    facets = {}
+    for field in FACET_FIELDS:
+        others = {
+            key: value for key, value in filters.items()
+            if key not in _FACET_OWN_FILTERS[field]
+        }
+        active = any(v is not None for k, v in others.items() if k != "status")
+        if not active and restrict is None:
+            facets[field] = _facets.counts(field)
+            continue
+
+        within = _index.candidates(**others) if active else restrict
+        if active and restrict is not None:
+            within &= restrict
+        facets[field] = _facets.counts(field, within)
+    return facets
+
+
+def suggest_locations(prefix: str, limit: int = 10) -> List[dict]:
+    """
+    City / locality completions for `prefix`, most published listings
+    first.
+    """
+    return _suggest.suggest(prefix, limit)
+
+
+def similar_listings(listing_id: str, limit: int = 10) -> Optional[List[dict]]:
+    """
+    Most similar published listings from the precomputed neighbour
+    table, or None if `listing_id` is not published.
+    """
+    listing = _listings.get(listing_id)
+    if not listing or listing["status"] != ListingStatus.PUBLISHED:
+        return None
+    if _similar is None:
+        return []
+    # A neighbour may be unpublished between the lookup and here
+    neighbours = (_listings.get(i) for i in _similar.neighbours(listing_id, limit) or [])
+    return [n for n in neighbours if n is not None]
 
 
 def get_listing_by_id(listing_id: str):
     return _listings.get(listing_id)
+
+
+def get_public_listing_detail(listing_id: str):
+    """
+    Returns (etag, body) for a published listing, serializing it at
+    most once per version.
+    """
+    listing = _listings.get(listing_id)
+    if not listing or listing["status"] != ListingStatus.PUBLISHED:
+        return None
+
+    version = listing.get("version", 0)
+    cached = _detail_cache.get(listing_id)
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+
+    body = ListingResponse.model_validate(listing).model_dump_json().encode()
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    _detail_cache[listing_id] = (version, etag, body)
+    return etag, body
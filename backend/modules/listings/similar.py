@@ -0,0 +1,278 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from modules.listings.columnar import np
+from modules.listings.geo import EARTH_RADIUS_KM
+from modules.listings.indexes import _key, effective_price
+
+SIMILAR_K = 10
+
+# Groups up to this size get their whole table computed in one batch on
+# load; larger ones fill in per listing on first request
+BATCH_GROUP_LIMIT = 20_000
+# Rows per distance block, so a block is at most ~16M floats
+_BLOCK_CELLS = 16_000_000
+
+_KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180
+
+# One feature unit ~ "one extra bedroom" of difference
+FEATURE_SCALES = {
+    "bhk": 1.0,
+    "beds": 1.0,
+    "baths": 1.0,
+    "log_area": 0.25,   # ~28% larger / smaller
+    "log_price": 0.2,   # ~22% dearer / cheaper
+    "lat_km": 2.0,
+    "lng_km": 2.0,
+}
+N_FEATURES = len(FEATURE_SCALES)
+
+_UNCOMPUTED = -1.0
+
+
+def features(listing: dict) -> List[float]:
+    lat = listing.get("lat") or 0.0
+    lng = listing.get("lng") or 0.0
+    raw = {
+        "bhk": listing.get("bhk") or 0,
+        "beds": listing.get("beds") or 0,
+        "baths": listing.get("baths") or 0,
+        "log_area": math.log1p(listing.get("area_sqft") or 0),
+        "log_price": math.log1p(effective_price(listing)),
+        "lat_km": lat * _KM_PER_DEG,
+        "lng_km": lng * _KM_PER_DEG * math.cos(math.radians(lat)),
+    }
+    return [raw[name] / scale for name, scale in FEATURE_SCALES.items()]
+
+
+class _Group:
+    """
+    Feature rows of the published listings sharing a type and city,
+    packed densely (removal moves the last row into the hole).
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.row: Dict[str, int] = {}
+        self.x = np.zeros((16, N_FEATURES), dtype=np.float64)
+        # Distance to the k-th neighbour in each row's table entry,
+        # _UNCOMPUTED if the row has no entry yet
+        self.kth = np.full(16, _UNCOMPUTED)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, listing_id: str, vector: List[float]) -> int:
+        n = len(self.ids)
+        if n == len(self.x):
+            self.x = np.concatenate([self.x, np.zeros_like(self.x)])
+            self.kth = np.concatenate([self.kth, np.full(len(self.kth), _UNCOMPUTED)])
+        self.x[n] = vector
+        self.kth[n] = _UNCOMPUTED
+        self.ids.append(listing_id)
+        self.row[listing_id] = n
+        return n
+
+    def load(self, ids: List[str], vectors: List[Tuple]):
+        self.ids = ids
+        self.row = {listing_id: row for row, listing_id in enumerate(ids)}
+        self.x = np.array(vectors, dtype=np.float64).reshape(-1, N_FEATURES)
+        self.kth = np.full(len(ids), _UNCOMPUTED)
+
+    def remove(self, listing_id: str):
+        row = self.row.pop(listing_id)
+        last = len(self.ids) - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row] = moved
+            self.row[moved] = row
+            self.x[row] = self.x[last]
+            self.kth[row] = self.kth[last]
+        self.ids.pop()
+
+    def distances(self, vector) -> "np.ndarray":
+        diff = self.x[:len(self.ids)] - vector
+        return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+
+class SimilarListings:
+    """
+    Precomputed k-nearest-neighbour table over published listings.
+
+    Listings are grouped by (listing_type, city), so rents are never
+    compared with sale prices, and compared by scaled Euclidean distance
+    over bhk, beds, baths, log area, log price and position.
+
+    Publishing a listing merges it into the entries it beats; removing
+    one drops the entries that listed it, which are recomputed (one
+    vectorized pass over the group) when next asked for. Both find the
+    affected entries by comparing one distance vector with each row's
+    k-th neighbour distance.
+    """
+
+    def __init__(self, k: int = SIMILAR_K):
+        if np is None:
+            raise RuntimeError("numpy is required for similar listings")
+        self.k = k
+        self._groups: Dict[Tuple, _Group] = {}
+        self._group_of: Dict[str, Tuple] = {}
+        self._vectors: Dict[str, Tuple] = {}
+        # listing_id -> [(distance, neighbour_id)], nearest first
+        self._table: Dict[str, List[Tuple[float, str]]] = {}
+        # neighbours() writes lazily filled entries too
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _group_key(listing: dict) -> Tuple:
+        return (_key(listing.get("listing_type")), _key(listing.get("city")))
+
+    def update(self, listing: dict, published: bool):
+        listing_id = listing["id"]
+        if not published:
+            self.discard(listing_id)
+            return
+
+        key = self._group_key(listing)
+        vector = tuple(features(listing))
+        with self._lock:
+            if self._group_of.get(listing_id) == key and self._vectors[listing_id] == vector:
+                return
+            self._discard(listing_id)
+            self._insert(listing_id, key, vector)
+
+    def load(self, listings: Iterable[dict]):
+        """
+        Bulk variant of update() for an empty table: builds each group's
+        matrix in one go, then batch-computes the groups small enough.
+        """
+        members: Dict[Tuple, Tuple[List[str], List[Tuple]]] = {}
+        with self._lock:
+            for listing in listings:
+                if _key(listing.get("status")) == "PUBLISHED":
+                    key = self._group_key(listing)
+                    vector = tuple(features(listing))
+                    ids, vectors = members.setdefault(key, ([], []))
+                    ids.append(listing["id"])
+                    vectors.append(vector)
+                    self._group_of[listing["id"]] = key
+                    self._vectors[listing["id"]] = vector
+
+            for key, (ids, vectors) in members.items():
+                group = self._groups[key] = _Group()
+                group.load(ids, vectors)
+                if len(group) <= BATCH_GROUP_LIMIT:
+                    self._compute_group(group)
+
+    def _insert(self, listing_id: str, key: Tuple, vector: Tuple):
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _Group()
+        self._group_of[listing_id] = key
+        self._vectors[listing_id] = vector
+        row = group.add(listing_id, vector)
+
+        dist = group.distances(np.asarray(vector))
+        dist[row] = np.inf
+        self._set_entry(group, row, *self._nearest(dist))
+
+        # Existing entries this listing now belongs in
+        n = len(group)
+        beaten = np.nonzero(dist[:n] < group.kth[:n])[0]
+        for other in beaten.tolist():
+            entry = self._table[group.ids[other]]
+            entry.append((float(dist[other]), listing_id))
+            entry.sort()
+            if len(entry) > self.k:
+                entry.pop()
+            if len(entry) == self.k:
+                group.kth[other] = entry[-1][0]
+
+    def discard(self, listing_id: str):
+        with self._lock:
+            self._discard(listing_id)
+
+    def _discard(self, listing_id: str):
+        key = self._group_of.pop(listing_id, None)
+        if key is None:
+            return
+        del self._vectors[listing_id]
+        group = self._groups[key]
+        self._table.pop(listing_id, None)
+
+        # Only entries whose k-th distance reaches this listing can list
+        # it (with slack for the batch path's rounding)
+        row = group.row[listing_id]
+        n = len(group)
+        dist = group.distances(group.x[row])
+        kth = group.kth[:n]
+        for other in np.nonzero(dist <= kth + 1e-9 * (1 + kth))[0].tolist():
+            other_id = group.ids[other]
+            if other != row and any(i == listing_id for _, i in self._table[other_id]):
+                del self._table[other_id]
+                group.kth[other] = _UNCOMPUTED
+
+        group.remove(listing_id)
+        if not len(group):
+            del self._groups[key]
+
+    def _nearest(self, dist: "np.ndarray") -> Tuple[List[int], List[float]]:
+        k = min(self.k, len(dist) - 1)
+        if k <= 0:
+            return [], []
+        rows = np.argpartition(dist, k - 1)[:k]
+        rows = rows[np.argsort(dist[rows], kind="stable")]
+        return rows.tolist(), dist[rows].tolist()
+
+    def _set_entry(self, group: _Group, row: int, rows: List[int], dists: List[float]):
+        entry = list(zip(dists, map(group.ids.__getitem__, rows)))
+        self._table[group.ids[row]] = entry
+        # A short entry (small group) accepts anything new
+        group.kth[row] = entry[-1][0] if len(entry) == self.k else np.inf
+
+    def _compute_group(self, group: _Group):
+        """
+        Batch kNN for every row of the group via blocked
+        |a|^2 + |b|^2 - 2ab distance matrices.
+        """
+        n = len(group)
+        if n < 2:
+            for row in range(n):
+                self._set_entry(group, row, [], [])
+            return
+
+        x = group.x[:n]
+        sq = np.einsum("ij,ij->i", x, x)
+        k = min(self.k, n - 1)
+        block = max(1, _BLOCK_CELLS // n)
+        for start in range(0, n, block):
+            stop = min(n, start + block)
+            d2 = sq[start:stop, None] + sq[None, :] - 2 * (x[start:stop] @ x.T)
+            np.maximum(d2, 0, out=d2)
+            d2[np.arange(stop - start), np.arange(start, stop)] = np.inf
+            nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            nearest_d2 = np.take_along_axis(d2, nearest, axis=1)
+            order = np.argsort(nearest_d2, axis=1, kind="stable")
+            nearest = np.take_along_axis(nearest, order, axis=1).tolist()
+            nearest_dist = np.sqrt(np.take_along_axis(nearest_d2, order, axis=1)).tolist()
+            for i, row in enumerate(range(start, stop)):
+                self._set_entry(group, row, nearest[i], nearest_dist[i])
+
+    def neighbours(self, listing_id: str, limit: Optional[int] = None) -> Optional[List[str]]:
+        """
+        Ids of the most similar published listings, nearest first, or
+        None if `listing_id` is not a published listing.
+        """
+        with self._lock:
+            key = self._group_of.get(listing_id)
+            if key is None:
+                return None
+            entry = self._table.get(listing_id)
+            if entry is None:
+                group = self._groups[key]
+                row = group.row[listing_id]
+                dist = group.distances(group.x[row])
+                dist[row] = np.inf
+                self._set_entry(group, row, *self._nearest(dist))
+                entry = self._table[listing_id]
+            return [neighbour for _, neighbour in entry[:limit or self.k]]
@@ -0,0 +1,123 @@
+import heapq
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from modules.listings.indexes import _key
+
+# (type, value, city): ("city", "Noida", None) / ("locality", "Sector 62", "Noida")
+Suggestion = Tuple[str, str, Optional[str]]
+
+MAX_SUGGESTIONS = 10
+PREFIX_CACHE_SIZE = 50_000
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _search_keys(value: str) -> List[str]:
+    """
+    "Sector 62" is found by typing "sec..." or "62..."
+    """
+    words = _normalize(value).split(" ")
+    return [" ".join(words[i:]) for i in range(len(words)) if words[i]]
+
+
+class SuggestIndex:
+    """
+    Prefix lookup over the cities and localities of published listings,
+    weighted by how many published listings carry them.
+
+    Search keys live in a sorted array, so a prefix is a bisect range.
+    The top suggestions per prefix are cached and only the prefixes of
+    a value whose count changed are invalidated, which keeps repeated
+    keypresses to a dict lookup.
+    """
+
+    def __init__(self):
+        self._counts: Dict[Suggestion, int] = {}
+        self._keys: List[Tuple[str, Suggestion]] = []
+        self._values: Dict[str, List[Suggestion]] = {}
+        self._cache: Dict[str, List[Tuple[Suggestion, int]]] = {}
+
+    @staticmethod
+    def _suggestions(listing: dict) -> List[Suggestion]:
+        city = _key(listing.get("city"))
+        locality = listing.get("locality")
+        found = []
+        if city:
+            found.append(("city", city, None))
+            if locality:
+                found.append(("locality", locality, city))
+        return found
+
+    def update(self, listing: dict, published: bool):
+        listing_id = listing["id"]
+        new = self._suggestions(listing) if published else []
+        old = self._values.get(listing_id, [])
+        if new == old:
+            return
+
+        for suggestion in old:
+            self._adjust(suggestion, -1)
+        for suggestion in new:
+            self._adjust(suggestion, 1)
+        if new:
+            self._values[listing_id] = new
+        else:
+            self._values.pop(listing_id, None)
+
+    def load(self, listings: Iterable[dict]):
+        for listing in listings:
+            self.update(listing, _key(listing.get("status")) == "PUBLISHED")
+
+    def _adjust(self, suggestion: Suggestion, delta: int):
+        count = self._counts.get(suggestion, 0) + delta
+        keys = _search_keys(suggestion[1])
+
+        if count <= 0:
+            self._counts.pop(suggestion, None)
+            for key in keys:
+                pos = bisect_left(self._keys, (key, suggestion))
+                if pos < len(self._keys) and self._keys[pos] == (key, suggestion):
+                    del self._keys[pos]
+        else:
+            if suggestion not in self._counts:
+                for key in keys:
+                    insort(self._keys, (key, suggestion))
+            self._counts[suggestion] = count
+
+        for key in keys:
+            for end in range(1, len(key) + 1):
+                self._cache.pop(key[:end], None)
+
+    def suggest(self, prefix: str, limit: int = MAX_SUGGESTIONS) -> List[dict]:
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+
+        top = self._cache.get(prefix)
+        if top is None:
+            top = self._top(prefix)
+            if len(self._cache) >= PREFIX_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[prefix] = top
+
+        return [
+            {"type": kind, "value": value, "city": city, "count": count}
+            for (kind, value, city), count in top[:limit]
+        ]
+
+    def _top(self, prefix: str) -> List[Tuple[Suggestion, int]]:
+        pos = bisect_left(self._keys, (prefix,))
+        matched = {}
+        while pos < len(self._keys) and self._keys[pos][0].startswith(prefix):
+            suggestion = self._keys[pos][1]
+            matched[suggestion] = self._counts[suggestion]
+            pos += 1
+        # Cities first on ties, then alphabetical, so results are stable
+        return heapq.nsmallest(
+            MAX_SUGGESTIONS,
+            matched.items(),
+            key=lambda item: (-item[1], item[0][0] != "city", item[0][1]),
+        )
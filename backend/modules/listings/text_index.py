@@ -0,0 +1,168 @@
+import math
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+TEXT_FIELDS = ("title", "locality", "city")
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Terms reached through prefix expansion score lower than exact hits
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 50
+MIN_PREFIX_LENGTH = 2
+
+# "2bhk" -> "2", "bhk" so it matches titles written as "2 BHK"
+_TOKEN_RE = re.compile(r"[a-z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _tokens(source: Tuple) -> List[str]:
+    return tokenize(" ".join(str(value) for value in source if value))
+
+
+class TextIndex:
+    """
+    Inverted index over listing title, locality and city, ranked with
+    BM25.
+
+    Postings are term -> {listing_id: term frequency}. Each document's
+    source fields are remembered so unchanged documents are skipped and
+    a removal can re-tokenize to find its postings, and a sorted
+    vocabulary serves prefix expansion.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._sources: Dict[str, Tuple] = {}
+        self._vocab: List[str] = []
+        self._total_len = 0
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def export(self) -> dict:
+        """
+        A copy of the index state, unaffected by later adds, so it can be
+        serialized on another thread.
+        """
+        return {
+            "postings": {term: dict(postings) for term, postings in self._postings.items()},
+            "doc_len": dict(self._doc_len),
+            "sources": dict(self._sources),
+        }
+
+    def restore(self, state: dict):
+        """
+        Adopts state produced by export(), e.g. from a snapshot, instead
+        of re-tokenizing every document.
+        """
+        self._postings = state["postings"]
+        self._doc_len = state["doc_len"]
+        self._sources = state["sources"]
+        self._vocab = sorted(self._postings)
+        self._total_len = sum(self._doc_len.values())
+
+    def add(self, listing: dict):
+        self._add(listing, sort_vocab=True)
+
+    def load(self, listings: Iterable[dict]):
+        """
+        Bulk variant of add(): sorts the vocabulary once at the end
+        instead of an insort per new term.
+        """
+        for listing in listings:
+            self._add(listing, sort_vocab=False)
+        self._vocab.sort()
+
+    def _add(self, listing: dict, sort_vocab: bool):
+        doc_id = listing["id"]
+        source = tuple(listing.get(field) for field in TEXT_FIELDS)
+        if self._sources.get(doc_id) == source:
+            return
+
+        self.discard(doc_id)
+        self._sources[doc_id] = source
+
+        terms = Counter(_tokens(source))
+        if not terms:
+            return
+
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if sort_vocab:
+                    insort(self._vocab, term)
+                else:
+                    self._vocab.append(term)
+            postings[doc_id] = tf
+
+        length = sum(terms.values())
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+    def discard(self, doc_id: str):
+        source = self._sources.pop(doc_id, None)
+        if doc_id not in self._doc_len:
+            return
+
+        self._total_len -= self._doc_len.pop(doc_id)
+        for term in set(_tokens(source)):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect_left(self._vocab, term)]
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        expansions = []
+        if token in self._postings:
+            expansions.append((token, 1.0))
+        if len(token) < MIN_PREFIX_LENGTH:
+            return expansions
+
+        pos = bisect_left(self._vocab, token)
+        while (
+            pos < len(self._vocab)
+            and self._vocab[pos].startswith(token)
+            and len(expansions) < MAX_PREFIX_EXPANSIONS
+        ):
+            term = self._vocab[pos]
+            if term != token:
+                expansions.append((term, PREFIX_WEIGHT))
+            pos += 1
+        return expansions
+
+    def search(self, query: str) -> Dict[str, float]:
+        """
+        Returns {listing_id: BM25 score} for every document matching at
+        least one query token, exactly or by prefix.
+        """
+        n_docs = len(self._doc_len)
+        if not n_docs:
+            return {}
+        avg_len = self._total_len / n_docs
+
+        scores: Dict[str, float] = {}
+        for token in dict.fromkeys(tokenize(query)):
+            best: Dict[str, float] = {}
+            for term, weight in self._expand(token):
+                postings = self._postings[term]
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = K1 * (1 - B + B * self._doc_len[doc_id] / avg_len)
+                    score = weight * idf * tf * (K1 + 1) / (tf + norm)
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        return scores
@@ -0,0 +1,155 @@
+import logging
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from core.config import UPLOADS_DIR, IMAGE_WORKERS
+from core.process_pool import process_pool
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is needed for derivatives only
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels
+DERIVATIVE_SIZES = {"thumb": 200, "card": 640, "full": 1600}
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+DERIVATIVES_DIR = UPLOADS_DIR / "derivatives"
+# Uploads that can be rendered; anything else is only served as-is
+RASTER_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+
+_pool: Optional[ProcessPoolExecutor] = None
+# source file name -> in-flight render, so repeat attaches are not re-rendered
+_pending: Dict[str, Future] = {}
+
+
+def source_path(url: str) -> Optional[Path]:
+    """
+    Local file behind an "/uploads/<name>" url (absolute or relative),
+    or None for anything else.
+    """
+    path = urlparse(url).path
+    if not path.startswith("/uploads/"):
+        return None
+    name = path[len("/uploads/"):]
+    if not name or "/" in name or name.startswith("."):
+        return None
+    source = UPLOADS_DIR / name
+    return source if source.is_file() else None
+
+
+def is_raster(path: Path) -> bool:
+    return path.suffix.lower() in RASTER_EXTENSIONS
+
+
+def derivative_dir(name: str) -> Path:
+    # The full name, extension included: "a.jpg" and "a.png" are
+    # different uploads
+    return DERIVATIVES_DIR / name
+
+
+def derivative_path(name: str, size: str, fmt: str) -> Path:
+    return derivative_dir(name) / f"{size}.{fmt}"
+
+
+def has_derivatives(name: str) -> bool:
+    return all(
+        derivative_path(name, size, fmt).is_file()
+        for size in DERIVATIVE_SIZES
+        for fmt in DERIVATIVE_FORMATS
+    )
+
+
+def render_derivatives(source: str, out_dir: str) -> List[str]:
+    """
+    Writes every size/format derivative of `source` into `out_dir`.
+    Runs in a pool worker; each file is written to a temp name and
+    renamed so readers never see a partial image.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    written = []
+
+    with Image.open(source) as original:
+        # JPEGs can decode straight at a reduced scale (no-op otherwise)
+        largest = max(DERIVATIVE_SIZES.values())
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        # Largest first, each size downscaled from the previous one
+        for size, edge in sorted(DERIVATIVE_SIZES.items(), key=lambda s: -s[1]):
+            image.thumbnail((edge, edge), Image.LANCZOS)
+            for fmt, (pil_format, options) in DERIVATIVE_FORMATS.items():
+                frame = image
+                if pil_format == "JPEG" and frame.mode == "RGBA":
+                    frame = Image.new("RGB", frame.size, (255, 255, 255))
+                    frame.paste(image, mask=image.getchannel("A"))
+                target = out / f"{size}.{fmt}"
+                tmp = target.with_name(f".{target.name}.tmp")
+                frame.save(tmp, pil_format, **options)
+                os.replace(tmp, target)
+                written.append(str(target))
+    return written
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = process_pool(IMAGE_WORKERS or os.cpu_count() or 1)
+    return _pool
+
+
+def _done(name: str, future: Future):
+    global _pool
+    _pending.pop(name, None)
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error("Image derivatives failed for %s: %s", name, error)
+        if isinstance(error, BrokenProcessPool):
+            # A worker died (e.g. OOM on a huge image); start a fresh pool
+            _pool = None
+
+
+def generate_derivatives(urls: Iterable[str]) -> int:
+    """
+    Queues derivative rendering for the local uploads among `urls` and
+    returns how many were queued. Does not wait for the renders.
+    """
+    if Image is None:
+        return 0
+
+    queued = 0
+    for url in urls:
+        source = source_path(url)
+        if (
+            source is None
+            or not is_raster(source)
+            or source.name in _pending
+            or has_derivatives(source.name)
+        ):
+            continue
+        out_dir = derivative_dir(source.name)
+        future = _get_pool().submit(render_derivatives, str(source), str(out_dir))
+        _pending[source.name] = future
+        future.add_done_callback(lambda f, name=source.name: _done(name, f))
+        queued += 1
+    return queued
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pending.clear()
@@ -0,0 +1,72 @@
+from fastapi import APIRouter, HTTPException, Query, Header, Depends, Request
+from fastapi.responses import FileResponse
+from typing import Optional
+
+from modules.media.images import (
+    DERIVATIVE_SIZES,
+    derivative_path,
+    generate_derivatives,
+    is_raster,
+    source_path,
+)
+from modules.media.store import inert_headers, store_upload
+
+try:
+    from core.security import require_role
+except ImportError:
+    def require_role(roles):
+        async def _noop():
+            return None
+        return _noop
+
+
+router = APIRouter(prefix="/media", tags=["Media"])
+
+# Derivatives never change for a given upload name
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Served while the derivative is still rendering; don't let it stick
+FALLBACK_CACHE_CONTROL = "no-cache"
+
+
+@router.post("")
+async def upload_media(
+    request: Request,
+    user=Depends(require_role(["admin"])),
+):
+    """
+    Raw request body upload; the Content-Type header names the format.
+    Returns the content-addressed "/uploads/<sha256>.<ext>" url.
+    """
+    media, error = await store_upload(
+        request.stream(), request.headers.get("content-type")
+    )
+    if error:
+        status_code = 413 if error == "File too large" else 400
+        raise HTTPException(status_code=status_code, detail=error)
+    generate_derivatives([media["url"]])
+    return media
+
+
+@router.get("/{name}")
+def get_image(
+    name: str,
+    size: str = Query("full", pattern=f"^({'|'.join(DERIVATIVE_SIZES)}|original)$"),
+    format: Optional[str] = Query(None, pattern="^(webp|jpeg)$"),
+    accept: Optional[str] = Header(None),
+):
+    source = source_path(f"/uploads/{name}")
+    if source is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {"Vary": "Accept", **inert_headers(source.name)}
+    if size != "original" and is_raster(source):
+        fmt = format or ("webp" if accept and "image/webp" in accept else "jpeg")
+        derivative = derivative_path(source.name, size, fmt)
+        if derivative.is_file():
+            headers["Cache-Control"] = DERIVATIVE_CACHE_CONTROL
+            return FileResponse(derivative, media_type=f"image/{fmt}", headers=headers)
+        # Uploaded before the pipeline existed, or still rendering
+        generate_derivatives([f"/uploads/{source.name}"])
+        headers["Cache-Control"] = FALLBACK_CACHE_CONTROL
+
+    return FileResponse(source, headers=headers)
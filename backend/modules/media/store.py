@@ -0,0 +1,182 @@
+import gzip
+import hashlib
+import os
+import re
+import uuid
+from typing import AsyncIterator, Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from core.config import UPLOADS_DIR, MEDIA_MAX_UPLOAD_BYTES
+
+# Stored media is named <sha256 of content><extension>
+CONTENT_TYPES = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/avif": ".avif",
+    "image/svg+xml": ".svg",
+    "application/pdf": ".pdf",
+    "video/mp4": ".mp4",
+}
+# Only text-like formats gain from a precompressed .gz sibling
+COMPRESSIBLE = {".svg"}
+# Formats that can carry script. They are served so that opening one
+# runs nothing and downloads it; <img> embedding still works.
+ACTIVE_CONTENT = {".svg"}
+ACTIVE_CONTENT_HEADERS = {
+    "Content-Security-Policy": "default-src 'none'; sandbox",
+    "Content-Disposition": "attachment",
+    "X-Content-Type-Options": "nosniff",
+}
+
+HASHED_NAME = re.compile(r"^([0-9a-f]{64})\.[a-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Older uploads are named by uuid and could in principle be replaced
+LEGACY_CACHE_CONTROL = "public, max-age=3600"
+
+INCOMING_DIR = UPLOADS_DIR / ".incoming"
+
+
+def inert_headers(name: str) -> dict:
+    """
+    Headers every response serving the stored file `name` must carry;
+    empty unless it is ACTIVE_CONTENT.
+    """
+    if os.path.splitext(name)[1].lower() in ACTIVE_CONTENT:
+        return dict(ACTIVE_CONTENT_HEADERS)
+    return {}
+
+
+def _write_gzip(path):
+    data = path.read_bytes()
+    # mtime=0 keeps the .gz byte-identical for identical content
+    packed = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(packed) < len(data):
+        tmp = path.with_name(f".{path.name}.gz.tmp")
+        tmp.write_bytes(packed)
+        os.replace(tmp, path.with_name(path.name + ".gz"))
+
+
+def _file_away(tmp, target, extension: str) -> bool:
+    """
+    Moves `tmp` to `target` unless identical content is already there;
+    returns whether it was.
+    """
+    if target.exists():
+        return True
+    os.replace(tmp, target)
+    if extension in COMPRESSIBLE:
+        _write_gzip(target)
+    return False
+
+
+async def store_upload(chunks: AsyncIterator[bytes], content_type: Optional[str]):
+    """
+    Streams an upload to disk while hashing it and files it under its
+    content hash. Uploading identical bytes again reuses the stored file.
+    File operations run in the threadpool, off the event loop.
+
+    Returns (media, error).
+    """
+    extension = CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+    if extension is None:
+        return None, "Unsupported media type"
+
+    await run_in_threadpool(INCOMING_DIR.mkdir, parents=True, exist_ok=True)
+    tmp = INCOMING_DIR / uuid.uuid4().hex
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        f = await run_in_threadpool(open, tmp, "wb")
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > MEDIA_MAX_UPLOAD_BYTES:
+                    return None, "File too large"
+                digest.update(chunk)
+                await run_in_threadpool(f.write, chunk)
+        finally:
+            await run_in_threadpool(f.close)
+        if not size:
+            return None, "Empty upload"
+
+        name = digest.hexdigest() + extension
+        target = UPLOADS_DIR / name
+        deduplicated = await run_in_threadpool(_file_away, tmp, target, extension)
+    finally:
+        await run_in_threadpool(tmp.unlink, missing_ok=True)
+
+    return {
+        "url": f"/uploads/{name}",
+        "hash": digest.hexdigest(),
+        "size": size,
+        "content_type": content_type,
+        "deduplicated": deduplicated,
+    }, None
+
+
+class MediaStaticFiles(StaticFiles):
+    """
+    StaticFiles for /uploads. Content-addressed files get an immutable
+    Cache-Control and their hash as a strong ETag, and a precompressed
+    .gz sibling is sent to clients that accept gzip. Byte ranges and
+    If-None-Match / If-Modified-Since are handled by Starlette.
+    """
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        name = os.path.basename(full_path)
+        hashed = HASHED_NAME.match(name)
+
+        headers = inert_headers(name)
+        if hashed:
+            headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+            headers["ETag"] = f'"{hashed.group(1)}"'
+        else:
+            headers["Cache-Control"] = LEGACY_CACHE_CONTROL
+
+        if os.path.splitext(name)[1] in COMPRESSIBLE:
+            headers["Vary"] = "Accept-Encoding"
+            gz_path = f"{full_path}.gz"
+            if (
+                "gzip" in request_headers.get("accept-encoding", "")
+                and "range" not in request_headers
+                and os.path.isfile(gz_path)
+            ):
+                full_path, stat_result = gz_path, os.stat(gz_path)
+                headers["Content-Encoding"] = "gzip"
+                if hashed:
+                    headers["ETag"] = f'"{hashed.group(1)}-gz"'
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=headers,
+            # Keep the original's type when sending the .gz sibling
+            media_type=self._media_type(name),
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    @staticmethod
+    def _media_type(name: str) -> Optional[str]:
+        extension = os.path.splitext(name)[1]
+        for content_type, ext in CONTENT_TYPES.items():
+            if ext == extension:
+                return content_type
+        return None
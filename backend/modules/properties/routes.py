@@ -10,6 +10,7 @@ from modules.properties.service import (
     update_property,
     delete_property,
 )
+from modules.media.images import generate_derivatives
 
 try:
     # current working RBAC
@@ -99,6 +100,7 @@ async def add_images(
             "updated_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    generate_derivatives(images)
 
     return {"message": "Images added", "images": updated}
 
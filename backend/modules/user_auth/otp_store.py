@@ -0,0 +1,286 @@
+import heapq
+import json
+from abc import ABC, abstractmethod
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core import sqlite_db
+from core.config import OTP_STORE_PATH, OTP_STORE_SHARDS
+
+# Expired entries evicted per shard on each call; keeps any one call cheap
+SWEEP_BATCH = 64
+# The SQLite store deletes expired rows at most this often
+SQLITE_SWEEP_INTERVAL_SECONDS = 30.0
+
+# Receives a copy of the live session; returns the new session, or None
+# to delete it
+SessionUpdate = Callable[[dict], Optional[dict]]
+
+
+def session_deadline(session: dict) -> float:
+    """
+    When a session may be evicted: once its OTP has expired and any
+    lock on it has run out.
+    """
+    return max(session["expires_at"], session.get("locked_until") or 0.0)
+
+
+class OTPStore(ABC):
+    """
+    Storage for OTP sessions and per-phone request windows. Sessions are
+    evicted once past session_deadline(); request hits once they leave
+    the sliding window. Times are epoch seconds.
+    """
+
+    @abstractmethod
+    def get(self, phone: str, now: float) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def put(self, phone: str, now: float, session: dict):
+        ...
+
+    @abstractmethod
+    def update(self, phone: str, now: float, fn: SessionUpdate) -> bool:
+        """
+        Atomically applies `fn` to the live session. False if there is
+        no live session (fn is not called).
+        """
+
+    @abstractmethod
+    def delete(self, phone: str):
+        ...
+
+    @abstractmethod
+    def hit(self, phone: str, now: float, window: float, limit: int) -> bool:
+        """
+        Records a request if fewer than `limit` were recorded in the last
+        `window` seconds; False (and nothing recorded) otherwise.
+        """
+
+    @abstractmethod
+    def sweep(self, now: float) -> int:
+        ...
+
+    def close(self):
+        pass
+
+
+class _Shard:
+    __slots__ = ("lock", "sessions", "hits", "heap")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # phone -> (deadline, session)
+        self.sessions: Dict[str, Tuple[float, dict]] = {}
+        # phone -> [deadline, request times inside the window, oldest first]
+        self.hits: Dict[str, list] = {}
+        # (deadline, kind, phone); stale entries are skipped on pop
+        self.heap: List[Tuple[float, str, str]] = []
+
+    def sweep(self, now: float, limit: Optional[int] = None) -> int:
+        evicted = 0
+        heap = self.heap
+        while heap and heap[0][0] <= now and (limit is None or evicted < limit):
+            deadline, kind, phone = heapq.heappop(heap)
+            if kind == "s":
+                entry = self.sessions.get(phone)
+                if entry is not None and entry[0] <= now:
+                    del self.sessions[phone]
+                    evicted += 1
+            else:
+                entry = self.hits.get(phone)
+                if entry is not None and entry[0] <= now:
+                    del self.hits[phone]
+                    evicted += 1
+        return evicted
+
+
+class MemoryOTPStore(OTPStore):
+    """
+    In-process store split into `shards` independently locked shards,
+    each with an expiry heap. Every call evicts a few expired entries
+    from the shard it touches, so memory tracks live sessions rather
+    than every phone ever seen.
+    """
+
+    def __init__(self, shards: int = OTP_STORE_SHARDS):
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+
+    def _shard(self, phone: str) -> _Shard:
+        return self._shards[hash(phone) % len(self._shards)]
+
+    def __len__(self):
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def get(self, phone, now):
+        shard = self._shard(phone)
+        with shard.lock:
+            shard.sweep(now, SWEEP_BATCH)
+            entry = shard.sessions.get(phone)
+        if entry is None or entry[0] <= now:
+            return None
+        return dict(entry[1])
+
+    def put(self, phone, now, session):
+        deadline = session_deadline(session)
+        shard = self._shard(phone)
+        with shard.lock:
+            shard.sweep(now, SWEEP_BATCH)
+            shard.sessions[phone] = (deadline, dict(session))
+            heapq.heappush(shard.heap, (deadline, "s", phone))
+
+    def update(self, phone, now, fn):
+        shard = self._shard(phone)
+        with shard.lock:
+            shard.sweep(now, SWEEP_BATCH)
+            entry = shard.sessions.get(phone)
+            if entry is None or entry[0] <= now:
+                return False
+            session = fn(dict(entry[1]))
+            if session is None:
+                del shard.sessions[phone]
+            else:
+                deadline = session_deadline(session)
+                shard.sessions[phone] = (deadline, session)
+                if deadline != entry[0]:
+                    heapq.heappush(shard.heap, (deadline, "s", phone))
+        return True
+
+    def delete(self, phone):
+        shard = self._shard(phone)
+        with shard.lock:
+            shard.sessions.pop(phone, None)
+
+    def hit(self, phone, now, window, limit):
+        shard = self._shard(phone)
+        with shard.lock:
+            shard.sweep(now, SWEEP_BATCH)
+            entry = shard.hits.get(phone)
+            if entry is None:
+                entry = shard.hits[phone] = [0.0, deque()]
+            hits = entry[1]
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False
+            hits.append(now)
+            entry[0] = now + window
+            heapq.heappush(shard.heap, (entry[0], "h", phone))
+        return True
+
+    def sweep(self, now):
+        evicted = 0
+        for shard in self._shards:
+            with shard.lock:
+                evicted += shard.sweep(now)
+        return evicted
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS otp_sessions (
+    phone TEXT PRIMARY KEY,
+    session TEXT NOT NULL,
+    deadline REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS otp_sessions_deadline ON otp_sessions (deadline);
+CREATE TABLE IF NOT EXISTS otp_hits (
+    phone TEXT NOT NULL,
+    at REAL NOT NULL,
+    until REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS otp_hits_phone ON otp_hits (phone, at);
+CREATE INDEX IF NOT EXISTS otp_hits_until ON otp_hits (until);
+"""
+
+
+class SQLiteOTPStore(OTPStore):
+    """
+    Store in a SQLite file, so several uvicorn workers on one host see
+    the same sessions and request windows. Read-modify-write calls run
+    in BEGIN IMMEDIATE transactions, which serialise them across
+    processes.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite_db.connect(path, _SCHEMA)
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _transaction(self, now: float):
+        if now - self._last_sweep >= SQLITE_SWEEP_INTERVAL_SECONDS:
+            self._last_sweep = now
+            self.sweep(now)
+        return sqlite_db.Immediate(self._conn, self._lock)
+
+    def get(self, phone, now):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT session FROM otp_sessions WHERE phone = ? AND deadline > ?",
+                (phone, now),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, phone, now, session):
+        with self._transaction(now) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO otp_sessions (phone, session, deadline) VALUES (?, ?, ?)",
+                (phone, json.dumps(session), session_deadline(session)),
+            )
+
+    def update(self, phone, now, fn):
+        with self._transaction(now) as conn:
+            row = conn.execute(
+                "SELECT session FROM otp_sessions WHERE phone = ? AND deadline > ?",
+                (phone, now),
+            ).fetchone()
+            if row is None:
+                return False
+            session = fn(json.loads(row[0]))
+            if session is None:
+                conn.execute("DELETE FROM otp_sessions WHERE phone = ?", (phone,))
+            else:
+                conn.execute(
+                    "UPDATE otp_sessions SET session = ?, deadline = ? WHERE phone = ?",
+                    (json.dumps(session), session_deadline(session), phone),
+                )
+        return True
+
+    def delete(self, phone):
+        with self._lock:
+            self._conn.execute("DELETE FROM otp_sessions WHERE phone = ?", (phone,))
+
+    def hit(self, phone, now, window, limit):
+        with self._transaction(now) as conn:
+            conn.execute("DELETE FROM otp_hits WHERE phone = ? AND at <= ?", (phone, now - window))
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM otp_hits WHERE phone = ?", (phone,)
+            ).fetchone()
+            if count >= limit:
+                return False
+            conn.execute(
+                "INSERT INTO otp_hits (phone, at, until) VALUES (?, ?, ?)",
+                (phone, now, now + window),
+            )
+        return True
+
+    def sweep(self, now):
+        with self._lock:
+            sessions = self._conn.execute(
+                "DELETE FROM otp_sessions WHERE deadline <= ?", (now,)
+            ).rowcount
+            hits = self._conn.execute(
+                "DELETE FROM otp_hits WHERE until <= ?", (now,)
+            ).rowcount
+        return sessions + hits
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_store(path: str = OTP_STORE_PATH) -> OTPStore:
+    if path:
+        return SQLiteOTPStore(path)
+    return MemoryOTPStore()
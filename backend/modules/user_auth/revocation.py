@@ -0,0 +1,149 @@
+import hashlib
+import math
+import threading
+import time
+
+from core import sqlite_db
+from core.config import REVOCATION_STORE_PATH
+
+# Expired revocations are purged (and the filter rebuilt) this often
+PURGE_INTERVAL_SECONDS = 10 * 60
+# Other workers' revocations are looked for at most this often, so a
+# typical is_revoked() is a pure in-memory check; it is also how long
+# one can take to be seen here
+PULL_INTERVAL_SECONDS = 0.1
+BLOOM_MIN_CAPACITY = 10_000
+BLOOM_ERROR_RATE = 0.001
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jti TEXT NOT NULL UNIQUE,
+    exp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS revoked_tokens_exp ON revoked_tokens (exp);
+"""
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings. No false negatives; false
+    positives at about `error_rate` once `capacity` items are in.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationStore:
+    """
+    Revoked refresh-token jtis, kept until the token's own exp.
+
+    SQLite holds the authoritative list, shared by every worker on the
+    host. Each process keeps only a Bloom filter of it: a miss answers
+    "not revoked" without touching SQLite, a hit is confirmed with a
+    primary-key lookup. Other workers' revocations are pulled into the
+    filter when SQLite reports a change (PRAGMA data_version), checked
+    at most every PULL_INTERVAL_SECONDS.
+    Expired rows are purged periodically and the filter rebuilt from
+    what is left, so both stay sized to live tokens.
+    """
+
+    def __init__(self, path: str = REVOCATION_STORE_PATH):
+        self._conn = sqlite_db.connect(path, _SCHEMA)
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        self._pulled_at = 0.0
+        with self._lock:
+            self._rebuild(time.time())
+
+    def _rebuild(self, now: float):
+        (live,) = self._conn.execute(
+            "SELECT COUNT(*) FROM revoked_tokens WHERE exp > ?", (now,)
+        ).fetchone()
+        self._bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, live * 2))
+        self._last_id = 0
+        self._version = None
+        self._pull(now)
+
+    def _pull(self, now: float):
+        """
+        Adds rows written since the last pull (by any process).
+        """
+        self._pulled_at = time.monotonic()
+        (version,) = self._conn.execute("PRAGMA data_version").fetchone()
+        if version == self._version:
+            return
+        self._version = version
+        rows = self._conn.execute(
+            "SELECT id, jti FROM revoked_tokens WHERE id > ? AND exp > ? ORDER BY id",
+            (self._last_id, now),
+        ).fetchall()
+        for row_id, jti in rows:
+            self._bloom.add(jti)
+        if rows:
+            self._last_id = rows[-1][0]
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild(now)
+
+    def _maybe_purge(self, now: float):
+        if now - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = now
+        self._conn.execute("DELETE FROM revoked_tokens WHERE exp <= ?", (now,))
+        self._rebuild(now)
+
+    def revoke(self, jti: str, exp: float):
+        now = time.time()
+        if exp <= now:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (jti, exp) VALUES (?, ?)", (jti, exp)
+            )
+            # data_version only moves for other connections' writes
+            self._bloom.add(jti)
+            if self._bloom.count > self._bloom.capacity:
+                self._rebuild(now)
+            self._maybe_purge(now)
+
+    def is_revoked(self, jti: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._maybe_purge(now)
+            if time.monotonic() - self._pulled_at >= PULL_INTERVAL_SECONDS:
+                self._pull(now)
+            if jti not in self._bloom:
+                return False
+            row = self._conn.execute(
+                "SELECT 1 FROM revoked_tokens WHERE jti = ? AND exp > ?", (jti, now)
+            ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM revoked_tokens").fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -30,12 +30,10 @@ def request_otp_api(payload: RequestOTP):
 
 @router.post("/verify-otp", response_model=UserAuthResponse)
 def verify_otp_api(payload: VerifyOTP):
-    result = verify_otp(payload.phone, payload.otp)
-    if not result:
+    user, is_new_user = verify_otp(payload.phone, payload.otp)
+    if not user:
         raise HTTPException(status_code=400, detail="OTP verification failed")
 
-    user, is_new_user = result
-
     access_token = create_access_token({
         "sub": user["id"],
         "role": user["role"],
@@ -59,9 +57,6 @@ def verify_otp_api(payload: VerifyOTP):
 
 @router.post("/refresh")
 def refresh_token_api(payload: RefreshTokenRequest):
-    if is_refresh_revoked(payload.refresh_token):
-        raise HTTPException(status_code=401, detail="Token revoked")
-
     try:
         data = decode_token(payload.refresh_token)
         if data.get("type") != "refresh":
@@ -69,6 +64,9 @@ def refresh_token_api(payload: RefreshTokenRequest):
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
+    if is_refresh_revoked(data["jti"]):
+        raise HTTPException(status_code=401, detail="Token revoked")
+
     access_token = create_access_token({
         "sub": data["sub"],
         "role": data["role"],
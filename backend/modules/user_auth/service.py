@@ -1,12 +1,17 @@
 import random
+import time
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict
 
+from core.security import decode_token
+from modules.user_auth.otp_store import create_store
+from modules.user_auth.revocation import RevocationStore
+
 # IN-MEMORY STORES (DB READY)
 _users: Dict[str, dict] = {}         
-_otp_sessions: Dict[str, dict] = {}   
-_revoked_refresh_tokens = set()       
+_otp_sessions = create_store()
+_revoked_refresh_tokens = RevocationStore()
 
 OTP_EXPIRY_MINUTES = 5
 OTP_MAX_ATTEMPTS = 5
@@ -25,28 +30,32 @@ def _generate_otp() -> str:
 
 
 def request_otp(phone: str):
-    now = _now()
-    session = _otp_sessions.get(phone)
+    now = time.time()
+    session = _otp_sessions.get(phone, now)
 
     if session and session.get("locked_until") and now < session["locked_until"]:
         return None, "OTP temporarily locked. Try later"
 
     if session and session.get("last_sent_at"):
-        if (now - session["last_sent_at"]).total_seconds() < OTP_REQUEST_COOLDOWN_SECONDS:
+        if now - session["last_sent_at"] < OTP_REQUEST_COOLDOWN_SECONDS:
             return None, "Please wait before requesting another OTP"
 
+    # Sliding window: at most OTP_MAX_REQUESTS_WINDOW sends in any
+    # OTP_REQUEST_WINDOW_MINUTES, not per fixed bucket
+    if not _otp_sessions.hit(
+        phone, now, OTP_REQUEST_WINDOW_MINUTES * 60, OTP_MAX_REQUESTS_WINDOW
+    ):
+        return None, "Too many OTP requests. Try later"
+
     otp = _generate_otp()
-    expires_at = now + timedelta(minutes=OTP_EXPIRY_MINUTES)
 
-    _otp_sessions[phone] = {
+    _otp_sessions.put(phone, now, {
         "otp": otp,
-        "expires_at": expires_at,
+        "expires_at": now + OTP_EXPIRY_MINUTES * 60,
         "attempts": 0,
         "locked_until": None,
         "last_sent_at": now,
-        "requests": session.get("requests", 0) + 1 if session else 1,
-        "window_start": session.get("window_start", now) if session else now,
-    }
+    })
 
     # TESTING ONLY
     print(f"[OTP] {phone} -> {otp}")
@@ -55,29 +64,33 @@ def request_otp(phone: str):
 
 
 def verify_otp(phone: str, otp: str):
-    session = _otp_sessions.get(phone)
-    now = _now()
-
-    if not session:
-        return None, "OTP not requested"
+    now = time.time()
+    error = None
 
-    if session.get("locked_until") and now < session["locked_until"]:
-        return None, "OTP attempts locked. Try later"
+    def attempt(session: dict):
+        nonlocal error
+        if session.get("locked_until") and now < session["locked_until"]:
+            error = "OTP attempts locked. Try later"
+            return session
 
-    if now > session["expires_at"]:
-        _otp_sessions.pop(phone, None)
-        return None, "OTP expired"
+        session["attempts"] += 1
 
-    session["attempts"] += 1
+        if session["otp"] != otp:
+            if session["attempts"] >= OTP_MAX_ATTEMPTS:
+                session["locked_until"] = now + OTP_LOCK_MINUTES * 60
+            error = "Invalid OTP"
+            return session
 
-    if session["otp"] != otp:
-        if session["attempts"] >= OTP_MAX_ATTEMPTS:
-            session["locked_until"] = now + timedelta(minutes=OTP_LOCK_MINUTES)
-        return None, "Invalid OTP"
+        # Used up
+        return None
 
-    
-    _otp_sessions.pop(phone, None)
+    if not _otp_sessions.update(phone, now, attempt):
+        # Never requested, or expired and evicted
+        return None, "OTP expired or not requested"
+    if error:
+        return None, error
 
+    now = _now()
     user = _users.get(phone)
     is_new_user = False
 
@@ -99,8 +112,12 @@ def verify_otp(phone: str, otp: str):
 
 
 def revoke_refresh_token(token: str):
-    _revoked_refresh_tokens.add(token)
+    payload = decode_token(token)
+    # Invalid or already expired tokens cannot be refreshed anyway
+    if not payload or payload.get("type") != "refresh" or not payload.get("jti"):
+        return
+    _revoked_refresh_tokens.revoke(payload["jti"], payload["exp"])
 
 
-def is_refresh_revoked(token: str) -> bool:
-    return token in _revoked_refresh_tokens
+def is_refresh_revoked(jti: str) -> bool:
+    return _revoked_refresh_tokens.is_revoked(jti)
@@ -1,9 +1,69 @@
+import asyncio
 import logging
+import random
+import uuid
+from collections import deque
+from typing import Deque, Optional
+
+from core.config import WHATSAPP_PROVIDER
 
 logger = logging.getLogger(__name__)
 
-# Placeholder config (real creds will be added later)
-WHATSAPP_PROVIDER = "MOCK"  # AiSensy / Interakt later
+
+class WhatsAppSendError(Exception):
+    """
+    A provider send failed. `retryable` is False for errors that will
+    not go away on retry (bad number, rejected template).
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MockWhatsAppProvider:
+    """
+    Local stand-in for the provider API, used until real creds exist
+    and in tests: optional latency, injectable failures, and a record
+    of the last `keep` messages sent (bounded, since the mock also runs
+    in the long-lived worker).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: Optional[int] = None,
+        keep: int = 1000,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.sent: Deque[dict] = deque(maxlen=keep)
+        self._random = random.Random(seed)
+
+    async def send(self, payload: dict) -> str:
+        """
+        Sends one message and returns the provider's message id.
+        """
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise WhatsAppSendError("Mock provider failure")
+
+        message_id = f"wamid.{uuid.uuid4().hex}"
+        self.sent.append({**payload, "message_id": message_id})
+        logger.info("WhatsApp message sent (mock): %s", payload.get("template"))
+        return message_id
+
+
+_PROVIDERS = {
+    "MOCK": MockWhatsAppProvider,
+}
+
+
+def get_provider():
+    # core.config only accepts providers listed here
+    return _PROVIDERS[WHATSAPP_PROVIDER]()
 
 
 def send_whatsapp_message(payload: dict) -> dict:
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Later statuses win; a message never goes back from read to delivered
+STATUS_RANK = {"sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+# How long the applier waits for the rest of a burst before flushing
+LINGER_SECONDS = 0.05
+
+# Receives {message_id: status}
+ApplyCallback = Callable[[Dict[str, str]], None]
+
+
+def status_rank(status: Optional[str]) -> int:
+    return STATUS_RANK.get(status, 0)
+
+
+class StatusIngest:
+    """
+    Buffer between the webhook and the lead store.
+
+    Submitted events are coalesced per message id, keeping only the
+    highest-ranked status, and a background task applies the buffer in
+    one bulk call after a short linger. Without a running applier,
+    submit() applies straight away.
+    """
+
+    def __init__(self, apply: ApplyCallback, linger: float = LINGER_SECONDS):
+        self.apply = apply
+        self.linger = linger
+        self._pending: Dict[str, str] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, events: Iterable[dict]) -> int:
+        """
+        Buffers well-formed events and returns how many there were.
+        Anything but a dict with non-empty string message_id and status
+        is skipped.
+        """
+        accepted = 0
+        for event in events:
+            if not isinstance(event, dict):
+                continue
+            message_id = event.get("message_id")
+            status = event.get("status")
+            if not isinstance(message_id, str) or not isinstance(status, str):
+                continue
+            if not message_id or not status:
+                continue
+            accepted += 1
+            current = self._pending.get(message_id)
+            if current is None or status_rank(status) >= status_rank(current):
+                self._pending[message_id] = status
+
+        if self._task is None:
+            self.flush()
+        elif self._pending:
+            self._wakeup.set()
+        return accepted
+
+    def flush(self):
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            self.apply(batch)
+        except Exception:
+            logger.exception("Applying %d WhatsApp statuses failed", len(batch))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.flush()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self.linger)
+            self._wakeup.clear()
+            self.flush()
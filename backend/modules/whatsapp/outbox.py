@@ -0,0 +1,310 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional, Set, Tuple
+
+from core.config import (
+    WHATSAPP_OUTBOX_PATH,
+    WHATSAPP_SEND_CONCURRENCY,
+    WHATSAPP_SEND_BATCH,
+    WHATSAPP_MAX_ATTEMPTS,
+    WHATSAPP_RETRY_BASE_SECONDS,
+    WHATSAPP_CLAIM_SECONDS,
+)
+from core import sqlite_db
+from modules.whatsapp.client import WhatsAppSendError, get_provider
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+# Idle workers still look for due retries this often
+POLL_INTERVAL_SECONDS = 1.0
+MAX_RETRY_SECONDS = 15 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lead_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    message_id TEXT,
+    last_error TEXT,
+    claimed_until REAL,
+    owner TEXT NOT NULL,
+    reported INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS outbox_results ON outbox (owner, reported, status);
+"""
+
+# Called with (lead_id, status, message_id) when a message is sent or
+# finally given up on
+ResultCallback = Callable[[str, str, Optional[str]], None]
+
+
+class Outbox:
+    """
+    Durable queue of WhatsApp messages in SQLite, shareable by several
+    worker processes.
+
+    claim() atomically moves due rows to SENDING under a lease. A row
+    whose lease runs out before the provider accepted it (the process
+    died mid-send) goes back to PENDING and is sent again
+    (at-least-once).
+
+    Each row records the `owner` that enqueued it. Leads live in their
+    owner's memory, so a send's result stays in the row until the owner
+    takes it with take_results(), whichever process sent it.
+    """
+
+    def __init__(
+        self,
+        path: str = WHATSAPP_OUTBOX_PATH,
+        lease: float = WHATSAPP_CLAIM_SECONDS,
+        owner: Optional[str] = None,
+    ):
+        self.lease = lease
+        self.owner = owner or uuid.uuid4().hex
+        self._conn = sqlite_db.connect(path, _SCHEMA)
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def enqueue(self, lead_id: str, payload: dict) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (lead_id, payload, status, next_attempt_at, owner, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (lead_id, json.dumps(payload), PENDING, now, self.owner, now, now),
+            )
+        for listener in self._listeners:
+            listener()
+        return cursor.lastrowid
+
+    def claim(self, limit: int) -> List[dict]:
+        """
+        Claims up to `limit` due messages for `lease` seconds. No other
+        process gets them until the lease runs out.
+        """
+        now = time.time()
+        with sqlite_db.Immediate(self._conn, self._lock) as conn:
+            conn.execute(
+                "UPDATE outbox SET status = ?, claimed_until = NULL, updated_at = ? "
+                "WHERE status = ? AND claimed_until <= ?",
+                (PENDING, now, SENDING, now),
+            )
+            rows = conn.execute(
+                "UPDATE outbox SET status = ?, claimed_until = ?, updated_at = ? "
+                "WHERE id IN (SELECT id FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?) "
+                "RETURNING id, lead_id, payload, attempts, next_attempt_at",
+                (SENDING, now + self.lease, now, PENDING, now, limit),
+            ).fetchall()
+        rows.sort(key=lambda row: row[4])
+        return [
+            {"id": row[0], "lead_id": row[1], "payload": json.loads(row[2]), "attempts": row[3]}
+            for row in rows
+        ]
+
+    def mark_sent(self, entry_id: int, message_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, message_id = ?, attempts = attempts + 1, "
+                "last_error = NULL, claimed_until = NULL, updated_at = ? WHERE id = ?",
+                (SENT, message_id, time.time(), entry_id),
+            )
+
+    def mark_failed(self, entry_id: int, error: str, retry_at: Optional[float]):
+        """
+        Records a failed attempt; retry_at=None gives up on the message.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, last_error = ?, "
+                "next_attempt_at = ?, claimed_until = NULL, updated_at = ? WHERE id = ?",
+                (PENDING if retry_at else FAILED, error, retry_at or now, now, entry_id),
+            )
+
+    def take_results(self, limit: int) -> List[Tuple[str, str, Optional[str]]]:
+        """
+        (lead_id, status, message_id) of this owner's messages that were
+        sent or given up on since the last call, by any process.
+        """
+        with sqlite_db.Immediate(self._conn, self._lock) as conn:
+            return conn.execute(
+                "UPDATE outbox SET reported = 1 WHERE id IN (SELECT id FROM outbox "
+                "WHERE owner = ? AND reported = 0 AND status IN (?, ?) LIMIT ?) "
+                "RETURNING lead_id, status, message_id",
+                (self.owner, SENT, FAILED, limit),
+            ).fetchall()
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def retry_delay(attempts: int, base: float = WHATSAPP_RETRY_BASE_SECONDS) -> float:
+    """
+    Exponential backoff with full jitter after `attempts` failures.
+    """
+    return random.uniform(0, min(MAX_RETRY_SECONDS, base * 2 ** (attempts - 1)))
+
+
+class OutboxWorker:
+    """
+    Background asyncio task draining the outbox: claims up to
+    `batch_size` due messages at a time and sends them with at most
+    `concurrency` provider calls in flight. Failed sends are retried
+    with backoff until `max_attempts`. Results of this process's own
+    messages go to `on_result`, including ones another process sent.
+    """
+
+    def __init__(
+        self,
+        outbox: Outbox,
+        provider=None,
+        on_result: Optional[ResultCallback] = None,
+        concurrency: int = WHATSAPP_SEND_CONCURRENCY,
+        batch_size: int = WHATSAPP_SEND_BATCH,
+        max_attempts: int = WHATSAPP_MAX_ATTEMPTS,
+    ):
+        self.outbox = outbox
+        self.provider = provider or get_provider()
+        self.on_result = on_result
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._inflight: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._sends: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self.outbox._listeners.append(self._notify)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._notify in self.outbox._listeners:
+            self.outbox._listeners.remove(self._notify)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Let sends already handed to the provider finish and be recorded
+        if self._sends:
+            await asyncio.gather(*self._sends, return_exceptions=True)
+        self._deliver_results()
+
+    def _notify(self):
+        # enqueue() runs in request threads as well as on the loop
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            self._deliver_results()
+            free = self.batch_size - len(self._inflight)
+            batch = self.outbox.claim(free) if free > 0 else []
+            for entry in batch:
+                self._inflight.add(entry["id"])
+                task = asyncio.create_task(self._send(entry))
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+            if batch and len(batch) == free:
+                # More may be due; come back once a slot frees up
+                await asyncio.wait(self._sends, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _send(self, entry: dict):
+        attempts = entry["attempts"] + 1
+        try:
+            async with self._semaphore:
+                message_id = await self.provider.send(entry["payload"])
+        except Exception as e:
+            retryable = getattr(e, "retryable", True)
+            if not isinstance(e, WhatsAppSendError):
+                logger.exception("WhatsApp send crashed for outbox entry %s", entry["id"])
+            if retryable and attempts < self.max_attempts:
+                self.outbox.mark_failed(entry["id"], str(e), time.time() + retry_delay(attempts))
+            else:
+                self.outbox.mark_failed(entry["id"], str(e), None)
+        else:
+            self.outbox.mark_sent(entry["id"], message_id)
+        finally:
+            self._inflight.discard(entry["id"])
+            self._wakeup.set()
+
+    def _deliver_results(self):
+        if self.on_result is None:
+            return
+        while True:
+            results = self.outbox.take_results(self.batch_size)
+            for lead_id, status, message_id in results:
+                try:
+                    self.on_result(lead_id, status, message_id)
+                except Exception:
+                    logger.exception("WhatsApp result callback failed for lead %s", lead_id)
+            if len(results) < self.batch_size:
+                return
+
+
+_outbox: Optional[Outbox] = None
+_worker: Optional[OutboxWorker] = None
+
+
+def get_outbox() -> Outbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = Outbox()
+    return _outbox
+
+
+def enqueue(lead_id: str, payload: dict) -> int:
+    return get_outbox().enqueue(lead_id, payload)
+
+
+def start_worker(on_result: Optional[ResultCallback] = None, provider=None) -> OutboxWorker:
+    global _worker
+    _worker = OutboxWorker(get_outbox(), provider=provider, on_result=on_result)
+    _worker.start()
+    return _worker
+
+
+async def stop_worker():
+    global _worker, _outbox
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
+    if _outbox is not None:
+        _outbox.close()
+        _outbox = None
@@ -1,20 +1,15 @@
-import uuid
-from datetime import datetime
 from typing import Dict
 
 # This file intentionally keeps provider logic abstract
-# so AiSensy / Interakt can be plugged later
+# so AiSensy / Interakt can be plugged later.
+# Messages are built here and sent by the outbox worker.
 
-def _generate_message_id(prefix: str) -> str:
-    return f"{prefix}_{uuid.uuid4()}"
 
-def send_tenant_property_catalogue(lead: Dict, listing: Dict) -> str:
+def tenant_property_catalogue(lead: Dict, listing: Dict) -> Dict:
     """
-    Sends WhatsApp property catalogue to tenant.
-    Returns whatsapp_message_id.
+    WhatsApp property catalogue message for a tenant lead.
     """
-
-    message_payload = {
+    return {
         "to": lead["phone"],
         "template": "tenant_property_catalogue",
         "data": {
@@ -25,22 +20,12 @@ def send_tenant_property_catalogue(lead: Dict, listing: Dict) -> str:
         }
     }
 
-    # Call AiSensy / Interakt API here
-    
-    whatsapp_message_id = _generate_message_id("TENANT")
-
-    # Log/debug only 
-    print("WhatsApp sent (tenant):", message_payload)
 
-    return whatsapp_message_id
-
-def send_owner_brochure_message(lead: Dict) -> str:
+def owner_brochure_message(lead: Dict) -> Dict:
     """
-    Sends WhatsApp brochure message to owner.
-    Returns whatsapp_message_id.
+    WhatsApp brochure message for an owner lead.
     """
-
-    message_payload = {
+    return {
         "to": lead["phone"],
         "template": "owner_brochure",
         "data": {
@@ -49,11 +34,3 @@ def send_owner_brochure_message(lead: Dict) -> str:
             "cta": "Reply with your property location & BHK",
         }
     }
-
-    # 🔹 PLACEHOLDER: Call WhatsApp provider API
-
-    whatsapp_message_id = _generate_message_id("OWNER")
-
-    print("WhatsApp sent (owner):", message_payload)
-
-    return whatsapp_message_id
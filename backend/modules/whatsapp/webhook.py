@@ -1,37 +1,53 @@
-from fastapi import APIRouter, Request
-from datetime import datetime
+from fastapi import APIRouter, Request, HTTPException
 
-from modules.leads.service import _leads
+from modules.leads.service import update_whatsapp_statuses
+from modules.whatsapp.ingest import StatusIngest
 
 router = APIRouter(
     prefix="/integrations/whatsapp",
     tags=["WhatsApp"]
 )
 
+_ingest = StatusIngest(apply=update_whatsapp_statuses)
+
+
+def start_ingest():
+    _ingest.start()
+
+
+async def stop_ingest():
+    await _ingest.stop()
+
+
+def _events(payload):
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for key in ("statuses", "events"):
+            if isinstance(payload.get(key), list):
+                return payload[key]
+        return [payload]
+    return []
+
 
 @router.post("/webhook")
 async def whatsapp_webhook(request: Request):
     """
-    Receives WhatsApp delivery/read callbacks.
-    Expected payload (example):
-    {
-        "message_id": "TENANT_xxx",
-        "status": "delivered" | "read"
-    }
-    """
+    Receives WhatsApp delivery/read callbacks, one or many per request.
+    Accepted payloads (example):
+    {"message_id": "wamid.xxx", "status": "delivered" | "read"}
+    [{"message_id": ..., "status": ...}, ...]
+    {"statuses": [{"message_id": ..., "status": ...}, ...]}
 
-    payload = await request.json()
-
-    message_id = payload.get("message_id")
-    status = payload.get("status")
+    Events are acknowledged immediately and applied to leads in bulk.
+    """
 
-    if not message_id or not status:
-        return {"ok": True}
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
 
-    for lead in _leads.values():
-        if lead.get("whatsapp_message_id") == message_id:
-            lead["whatsapp_status"] = status
-            lead["updated_at"] = datetime.utcnow()
-            break
+    events = [e for e in _events(payload) if isinstance(e, dict)]
+    accepted = _ingest.submit(events)
 
-    return {"ok": True}
+    return {"ok": True, "accepted": accepted}
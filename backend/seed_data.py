@@ -14,7 +14,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from uuid import uuid4
 from datetime import datetime, timezone
 from dotenv import load_dotenv
-from passlib.context import CryptContext
+from core.passwords import hash_password
 
 # Load environment variables
 load_dotenv()
@@ -23,10 +23,8 @@ MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017")
 DB_NAME = os.getenv("DB_NAME", "instamakaan")
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hash_password(password)
 
 
 async def seed_database():
@@ -1,20 +1,27 @@
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
 from core.config import APP_NAME, CORS_ORIGINS
 from core.database import close_db
+from core import passwords
 
 from modules.auth.routes import router as auth_router
 from modules.listings.routes import router as listings_router
+from modules.listings import service as listings_service
 from modules.leads.routes import router as leads_router
 from modules.owners.routes import router as owners_router
 from modules.agents.routes import router as agents_router
 from modules.properties.routes import router as properties_router
 from modules.inquiries.routes import router as inquiries_router
 from modules.dashboard.routes import router as dashboard_router
+from modules.media.routes import router as media_router
+from modules.media import images as media_images
+from modules.media.store import MediaStaticFiles
 from modules.whatsapp.webhook import router as whatsapp_webhook_router
+from modules.whatsapp import webhook as whatsapp_webhook
+from modules.whatsapp import outbox as whatsapp_outbox
+from modules.leads import service as leads_service
 from modules.user_auth.router import router as user_auth_router
 
 
@@ -22,10 +29,10 @@ BASE_DIR = Path(__file__).parent
 
 app = FastAPI(title=APP_NAME)
 
-# Static uploads
+# Static uploads (content-addressed files are cached as immutable)
 app.mount(
     "/uploads",
-    StaticFiles(directory=BASE_DIR / "uploads"),
+    MediaStaticFiles(directory=BASE_DIR / "uploads"),
     name="uploads"
 )
 
@@ -36,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Routers
@@ -47,10 +55,25 @@ app.include_router(agents_router, prefix="/api")
 app.include_router(properties_router, prefix="/api")
 app.include_router(inquiries_router, prefix="/api")
 app.include_router(dashboard_router, prefix="/api")
+app.include_router(media_router, prefix="/api")
 app.include_router(whatsapp_webhook_router)
 app.include_router(user_auth_router)
 
 
+@app.on_event("startup")
+async def startup():
+    listings_service.open_store()
+    whatsapp_outbox.start_worker(on_result=leads_service.record_whatsapp_result)
+    whatsapp_webhook.start_ingest()
+    leads_service.start_followups()
+
+
 @app.on_event("shutdown")
 async def shutdown():
+    await leads_service.stop_followups()
+    await whatsapp_webhook.stop_ingest()
+    await whatsapp_outbox.stop_worker()
+    listings_service.close_store()
+    media_images.shutdown_pool()
+    passwords.shutdown_pool()
     close_db()
@@ -0,0 +1,12 @@
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Keep every store in memory so tests never touch backend/data; set
+# before core.config is imported (load_dotenv does not override)
+for name in ("WHATSAPP_OUTBOX_PATH", "LISTINGS_DATA_DIR", "REVOCATION_STORE_PATH", "OTP_STORE_PATH"):
+    os.environ[name] = ""
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "4")
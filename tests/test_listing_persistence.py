@@ -0,0 +1,115 @@
+import pytest
+
+from modules.listings import service
+from modules.listings.persistence import ListingLog
+from modules.listings.schemas import ListingStatus
+
+
+def listing(listing_id, title, version=1):
+    return {"id": listing_id, "title": title, "status": ListingStatus.DRAFT, "version": version}
+
+
+def test_torn_final_record_is_dropped(tmp_path):
+    log = ListingLog(tmp_path)
+    for n in range(3):
+        log.append(listing(f"l{n}", f"title {n}"))
+    log.close()
+    with open(log.wal_path, "ab") as f:
+        # Header promising 100 bytes, then a crash after four
+        f.write(b"\x64\x00\x00\x00\x00\x00\x00\x00abcd")
+
+    log = ListingLog(tmp_path)
+    listings, _, replayed = log.load()
+    assert list(listings) == ["l0", "l1", "l2"]
+    assert replayed == ["l0", "l1", "l2"]
+    assert listings["l1"]["status"] == "DRAFT"
+
+    # The torn tail was cut off, so new records are readable after it
+    log.append(listing("l3", "title 3"))
+    log.close()
+    listings, _, _ = ListingLog(tmp_path).load()
+    assert list(listings) == ["l0", "l1", "l2", "l3"]
+
+
+def test_corrupt_record_stops_replay(tmp_path):
+    log = ListingLog(tmp_path)
+    log.append(listing("a", "first"))
+    log.append(listing("b", "second"))
+    log.close()
+    data = bytearray(log.wal_path.read_bytes())
+    data[-1] ^= 0xFF
+    log.wal_path.write_bytes(bytes(data))
+
+    listings, _, _ = ListingLog(tmp_path).load()
+    assert list(listings) == ["a"]
+
+
+def test_snapshot_plus_wal_restore(tmp_path):
+    log = ListingLog(tmp_path)
+    log.snapshot(
+        {"a": listing("a", "old"), "b": listing("b", "kept")},
+        {"text": {"postings": {}, "doc_len": {}, "sources": {}}},
+    )
+    log.append(listing("a", "new", version=2))
+    log.append(listing("c", "added"))
+    log.close()
+
+    listings, indexes, replayed = ListingLog(tmp_path).load()
+    assert list(listings) == ["a", "b", "c"]
+    assert listings["a"]["title"] == "new"
+    assert listings["b"]["title"] == "kept"
+    assert replayed == ["a", "c"]
+    assert "text" in indexes
+
+
+def test_crash_between_rotate_and_snapshot_loses_nothing(tmp_path):
+    log = ListingLog(tmp_path)
+    log.append(listing("a", "one"))
+    log.rotate()
+    log.append(listing("b", "two"))
+    log.close()
+    assert log.prev_wal_path.exists()
+
+    listings, _, replayed = ListingLog(tmp_path).load()
+    assert list(listings) == ["a", "b"]
+    assert replayed == ["a", "b"]
+
+
+def test_rejects_other_format_versions(tmp_path):
+    log = ListingLog(tmp_path)
+    log.snapshot({"a": listing("a", "one")})
+    data = bytearray(log.snapshot_path.read_bytes())
+    data[4] = 99
+    log.snapshot_path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        ListingLog(tmp_path).load()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "LISTINGS_SNAPSHOT_EVERY", 5)
+    service._rebuild({})
+    service.open_store(str(tmp_path))
+    yield tmp_path
+    service.close_store()
+    service._rebuild({})
+
+
+def test_service_restores_after_crash(store):
+    for n in range(12):
+        created = service.create_listing()
+        service.update_listing(created["id"], {"title": f"flat {n}", "city": "Pune"})
+    service._wait_for_snapshot()
+    before = {k: dict(v) for k, v in service._listings.items()}
+
+    # Crash: drop the log without a final snapshot
+    service._log.close()
+    service._log = None
+    service._rebuild({})
+    service.open_store(str(store))
+
+    assert list(service._listings) == list(before)
+    for listing_id, saved in before.items():
+        assert service._listings[listing_id]["title"] == saved["title"]
+        assert service._listings[listing_id]["version"] == saved["version"]
+    assert set(service._text.search("flat")) == set(before)
@@ -0,0 +1,63 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from modules.listings import service
+from modules.listings.routes import router
+
+LISTING = {
+    "listing_type": "RENT",
+    "city": "Pune",
+    "locality": "Baner",
+    "bhk": 2,
+    "beds": 2,
+    "baths": 2,
+    "area_sqft": 900,
+    "lat": 18.56,
+    "lng": 73.78,
+    "rent_monthly": 25000,
+    "deposit": 50000,
+    "media": [{"url": "https://cdn.example.com/1.jpg", "order": 0, "is_cover": True}],
+}
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return TestClient(app)
+
+
+@pytest.fixture
+def listings():
+    service._rebuild({})
+    ids = []
+    for title in ("2 BHK flat", "3 BHK villa", "Studio flat"):
+        listing = service.create_listing()
+        service.update_listing(listing["id"], {**LISTING, "title": title})
+        _, error = service.publish_listing(listing["id"])
+        assert error is None
+        ids.append(listing["id"])
+    yield ids
+    service._rebuild({})
+
+
+@pytest.mark.parametrize("q", [None, "", "   "])
+def test_relevance_without_query_uses_default_order(client, listings, q):
+    params = {"sort": "relevance", "limit": 2}
+    if q is not None:
+        params["q"] = q
+    response = client.get("/api/listings", params=params)
+    assert response.status_code == 200
+    default = client.get("/api/listings", params={"limit": 2})
+    assert [l["id"] for l in response.json()] == [l["id"] for l in default.json()]
+
+    cursor = response.headers["X-Next-Cursor"]
+    following = client.get("/api/listings", params={**params, "cursor": cursor})
+    assert following.status_code == 200
+
+
+def test_relevance_with_query_ranks_matches(client, listings):
+    response = client.get("/api/listings", params={"sort": "relevance", "q": "flat"})
+    assert response.status_code == 200
+    assert {l["title"] for l in response.json()} == {"2 BHK flat", "Studio flat"}
@@ -0,0 +1,110 @@
+import types
+
+import pytest
+
+from modules.user_auth import service
+from modules.user_auth.otp_store import MemoryOTPStore, OTPStore, SQLiteOTPStore
+
+PHONE = "9876543210"
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        store = MemoryOTPStore(shards=4)
+    else:
+        store = SQLiteOTPStore(str(tmp_path / "otp.sqlite3"))
+    yield store
+    store.close()
+
+
+def session(now, ttl=300, **extra):
+    return {"otp": "123456", "expires_at": now + ttl, "attempts": 0, "locked_until": None, **extra}
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        OTPStore()
+
+
+def test_sessions_are_evicted_after_their_ttl(store):
+    store.put(PHONE, 1000.0, session(1000.0, ttl=60))
+    assert store.get(PHONE, 1059.0)["otp"] == "123456"
+    assert store.get(PHONE, 1061.0) is None
+    assert not store.update(PHONE, 1061.0, lambda s: s)
+
+    store.sweep(1061.0)
+    assert store.get(PHONE, 1000.0) is None
+
+
+def test_a_lock_outlives_the_otp(store):
+    store.put(PHONE, 1000.0, session(1000.0, ttl=60, locked_until=1900.0))
+    assert store.get(PHONE, 1500.0)["locked_until"] == 1900.0
+    assert store.get(PHONE, 1901.0) is None
+
+
+def test_update_applies_or_deletes(store):
+    store.put(PHONE, 1000.0, session(1000.0))
+
+    def bump(current):
+        current["attempts"] += 1
+        return current
+
+    assert store.update(PHONE, 1001.0, bump)
+    assert store.get(PHONE, 1001.0)["attempts"] == 1
+    assert store.update(PHONE, 1002.0, lambda current: None)
+    assert store.get(PHONE, 1002.0) is None
+
+
+def test_request_window_slides(store):
+    assert [store.hit(PHONE, 1000.0 + n, 600, 3) for n in range(4)] == [True, True, True, False]
+    # The first hit leaves the window at 1600
+    assert not store.hit(PHONE, 1599.0, 600, 3)
+    assert store.hit(PHONE, 1600.5, 600, 3)
+    assert store.hit("9123456780", 1001.0, 600, 3)
+
+
+@pytest.fixture
+def otp(store, monkeypatch):
+    clock = types.SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(service, "_otp_sessions", store)
+    monkeypatch.setattr(service, "time", types.SimpleNamespace(time=lambda: clock.now))
+    monkeypatch.setattr(service, "_generate_otp", lambda: "123456")
+    return clock
+
+
+def test_attempts_lock_the_session(otp):
+    assert service.request_otp(PHONE) == (True, None)
+    for _ in range(service.OTP_MAX_ATTEMPTS - 1):
+        assert service.verify_otp(PHONE, "000000") == (None, "Invalid OTP")
+    assert service.verify_otp(PHONE, "000000") == (None, "Invalid OTP")
+
+    # Locked: even the right code is refused
+    assert service.verify_otp(PHONE, "123456") == (None, "OTP attempts locked. Try later")
+    assert service.request_otp(PHONE) == (None, "OTP temporarily locked. Try later")
+
+    otp.now += service.OTP_LOCK_MINUTES * 60 + 1
+    assert service.verify_otp(PHONE, "123456") == (None, "OTP expired or not requested")
+
+
+def test_correct_code_is_single_use(otp):
+    service.request_otp(PHONE)
+    user, _ = service.verify_otp(PHONE, "123456")
+    assert user["phone"] == PHONE
+    assert service.verify_otp(PHONE, "123456") == (None, "OTP expired or not requested")
+
+
+def test_expired_code_is_refused(otp):
+    service.request_otp(PHONE)
+    otp.now += service.OTP_EXPIRY_MINUTES * 60 + 1
+    assert service.verify_otp(PHONE, "123456") == (None, "OTP expired or not requested")
+
+
+def test_request_cooldown_and_window(otp):
+    assert service.request_otp(PHONE) == (True, None)
+    assert service.request_otp(PHONE) == (None, "Please wait before requesting another OTP")
+    for _ in range(service.OTP_MAX_REQUESTS_WINDOW - 1):
+        otp.now += service.OTP_REQUEST_COOLDOWN_SECONDS
+        assert service.request_otp(PHONE) == (True, None)
+    otp.now += service.OTP_REQUEST_COOLDOWN_SECONDS
+    assert service.request_otp(PHONE) == (None, "Too many OTP requests. Try later")
@@ -0,0 +1,104 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from core import passwords
+
+PASSWORD = "correct horse"
+# 91 bytes in UTF-8; bcrypt alone only looks at the first 72
+LONG_PASSWORD = "pässwörd-" + "x" * 80
+
+# Made by passlib 1.7.4 (bcrypt 4.0.1), which wrote the stored hashes
+PASSLIB_SHA256_V2 = "$bcrypt-sha256$v=2,t=2b,r=4$P74ecuSaBqkik4b/Ze10RO$5GWScRpMaWUWrMSgwgwiXmDnp6Vg8vi"
+PASSLIB_SHA256_V2_LONG = "$bcrypt-sha256$v=2,t=2b,r=4$oYOU6Zwp56ozb6wbJy7WlO$WGAV3FOBCFYtFScq8A6fEHXUu6w0o4y"
+PASSLIB_SHA256_V1 = "$bcrypt-sha256$2b,4$m3DqjQKdSdOtrS.Pi1.Ute$EH2vIe.pZNGSODdEX7Z630DpYcwf2si"
+PASSLIB_BCRYPT = "$2b$04$AKi76oXrSyV9AD2qeUi9zOk9u//Bue1FGuuofMUdrMt7dJq5wWjLa"
+PASSLIB_BCRYPT_LONG = "$2b$04$9Na3PswYWbSsZDi67gdulOFKg.i1A2ClnHZYhXrJvPckIqVqtLngO"
+
+
+@pytest.mark.parametrize("hashed, password", [
+    (PASSLIB_SHA256_V2, PASSWORD),
+    (PASSLIB_SHA256_V2_LONG, LONG_PASSWORD),
+    (PASSLIB_SHA256_V1, PASSWORD),
+    (PASSLIB_BCRYPT, PASSWORD),
+    (PASSLIB_BCRYPT_LONG, LONG_PASSWORD),
+])
+def test_verifies_passlib_hashes(hashed, password):
+    assert passwords.verify_password(password, hashed)
+    assert not passwords.verify_password("!" + password[1:], hashed)
+
+
+def test_hash_round_trip_and_format():
+    hashed = passwords.hash_password(PASSWORD, rounds=4)
+    assert hashed.startswith("$bcrypt-sha256$v=2,t=2b,r=4$")
+    assert passwords.verify_password(PASSWORD, hashed)
+    assert not passwords.verify_password("wrong", hashed)
+    assert not passwords.needs_rehash(hashed, rounds=4)
+    assert passwords.needs_rehash(hashed, rounds=5)
+
+
+def test_plain_bcrypt_long_passwords_match_passlib_truncation():
+    # passlib hashed only the first 72 bytes; so must the check
+    assert passwords.verify_password(LONG_PASSWORD[:-1] + "y", PASSLIB_BCRYPT_LONG)
+
+
+def test_long_passwords_are_not_truncated():
+    hashed = passwords.hash_password(LONG_PASSWORD, rounds=4)
+    assert passwords.verify_password(LONG_PASSWORD, hashed)
+    # Differs only past byte 72, which plain bcrypt would ignore
+    assert not passwords.verify_password(LONG_PASSWORD[:-1] + "y", hashed)
+    assert not passwords.verify_password(LONG_PASSWORD[:-1] + "y", PASSLIB_SHA256_V2_LONG)
+
+
+@pytest.mark.parametrize("hashed", ["", "plaintext", "$bcrypt-sha256$garbage", "$2b$04$short"])
+def test_malformed_hashes_never_verify(hashed):
+    assert not passwords.verify_password(PASSWORD, hashed)
+
+
+def test_verify_and_rehash_upgrades_old_hashes():
+    verified, new_hash = passwords.verify_and_rehash(PASSWORD, PASSLIB_BCRYPT, rounds=4)
+    assert verified and new_hash.startswith("$bcrypt-sha256$v=2")
+    assert passwords.verify_password(PASSWORD, new_hash)
+    assert passwords.verify_and_rehash("wrong", PASSLIB_BCRYPT, rounds=4) == (False, None)
+    assert passwords.verify_and_rehash(PASSWORD, PASSLIB_SHA256_V2, rounds=4) == (True, None)
+
+
+def test_service_restarts_after_shutdown_and_broken_pool():
+    service = passwords.PasswordService(workers=1, max_queue=4, rounds=4)
+
+    async def run():
+        hashed = await service.hash(PASSWORD)
+        assert await service.verify(PASSWORD, hashed)
+        assert not await service.verify("wrong", hashed)
+
+        service.shutdown()
+        assert service._pool is None
+        assert await service.verify(PASSWORD, hashed)
+
+        for process in list(service._pool._processes.values()):
+            process.kill()
+        with pytest.raises(BrokenProcessPool):
+            await service.verify(PASSWORD, hashed)
+        assert await service.verify(PASSWORD, hashed)
+
+    try:
+        asyncio.run(run())
+    finally:
+        service.shutdown()
+
+
+def test_service_rejects_past_max_queue():
+    service = passwords.PasswordService(workers=1, max_queue=0, rounds=4)
+
+    async def run():
+        return await asyncio.gather(
+            service.hash(PASSWORD), service.hash(PASSWORD), return_exceptions=True
+        )
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        service.shutdown()
+    assert sum(isinstance(r, passwords.PasswordServiceBusy) for r in results) == 1
+    assert service.stats()["rejected"] == 1
@@ -0,0 +1,62 @@
+import time
+
+from modules.user_auth import revocation
+from modules.user_auth.revocation import BloomFilter, RevocationStore
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    items = [f"jti-{n}" for n in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{n}" in bloom for n in range(10_000))
+    assert false_positives < 100
+
+
+def test_false_positive_falls_back_to_the_exact_store():
+    store = RevocationStore("")
+    store.revoke("revoked", time.time() + 60)
+    # Every bit set: the filter now claims every jti
+    store._bloom._bits = bytearray(b"\xff" * len(store._bloom._bits))
+    assert "never-revoked" in store._bloom
+
+    assert store.is_revoked("revoked")
+    assert not store.is_revoked("never-revoked")
+
+
+def test_revocations_expire_with_the_token(monkeypatch):
+    store = RevocationStore("")
+    store.revoke("expired-already", time.time() - 1)
+    assert len(store) == 0
+
+    store.revoke("short", time.time() + 0.05)
+    assert store.is_revoked("short")
+    time.sleep(0.06)
+    assert not store.is_revoked("short")
+
+    monkeypatch.setattr(revocation, "PURGE_INTERVAL_SECONDS", 0)
+    store.revoke("long", time.time() + 60)
+    assert len(store) == 1
+    assert store.is_revoked("long")
+
+
+def test_other_processes_revocations_are_pulled(tmp_path):
+    path = str(tmp_path / "revoked.sqlite3")
+    local = RevocationStore(path)
+    other = RevocationStore(path)
+    assert not local.is_revoked("jti-1")
+
+    other.revoke("jti-1", time.time() + 60)
+    time.sleep(revocation.PULL_INTERVAL_SECONDS)
+    assert local.is_revoked("jti-1")
+
+
+def test_filter_grows_past_its_capacity(monkeypatch):
+    monkeypatch.setattr(revocation, "BLOOM_MIN_CAPACITY", 10)
+    store = RevocationStore("")
+    exp = time.time() + 60
+    for n in range(50):
+        store.revoke(f"jti-{n}", exp)
+    assert store._bloom.capacity >= 50
+    assert all(store.is_revoked(f"jti-{n}") for n in range(50))
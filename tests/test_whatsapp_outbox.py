@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+
+from modules.whatsapp.client import MockWhatsAppProvider, WhatsAppSendError
+from modules.whatsapp.outbox import FAILED, PENDING, SENDING, SENT, Outbox, OutboxWorker
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    crashed = Outbox(path, lease=0.05)
+    other = Outbox(path)
+    crashed.enqueue("lead-1", {"template": "t"})
+
+    claimed = crashed.claim(10)
+    assert [entry["lead_id"] for entry in claimed] == ["lead-1"]
+    assert other.claim(10) == []
+    assert other.counts() == {SENDING: 1}
+
+    time.sleep(0.06)
+    reclaimed = other.claim(10)
+    assert [entry["id"] for entry in reclaimed] == [claimed[0]["id"]]
+    other.mark_sent(reclaimed[0]["id"], "wamid.1")
+    assert other.counts() == {SENT: 1}
+
+
+def test_retry_waits_for_next_attempt(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    outbox.enqueue("lead-1", {"template": "t"})
+    entry = outbox.claim(1)[0]
+    outbox.mark_failed(entry["id"], "timeout", time.time() + 60)
+    assert outbox.counts() == {PENDING: 1}
+    assert outbox.claim(1) == []
+
+
+def test_concurrent_claimers_never_share_a_row(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    writer = Outbox(path)
+    for n in range(300):
+        writer.enqueue(f"lead-{n}", {"template": "t"})
+
+    claimers = [Outbox(path) for _ in range(3)]
+    claimed = [[] for _ in claimers]
+
+    def drain(outbox, into):
+        while True:
+            batch = outbox.claim(7)
+            if not batch:
+                return
+            into.extend(entry["id"] for entry in batch)
+
+    threads = [
+        threading.Thread(target=drain, args=(outbox, into))
+        for outbox, into in zip(claimers, claimed)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ids = [entry_id for into in claimed for entry_id in into]
+    assert len(ids) == len(set(ids)) == 300
+
+
+class _Failing(MockWhatsAppProvider):
+    async def send(self, payload):
+        raise WhatsAppSendError("bad number", retryable=False)
+
+
+def test_results_go_to_the_owning_process(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    owner = Outbox(path)
+    sender = Outbox(path)
+    owner.enqueue("lead-owned", {"template": "t"})
+
+    async def run():
+        owner_results, sender_results = [], []
+        sending = OutboxWorker(
+            sender, provider=MockWhatsAppProvider(), on_result=lambda *r: sender_results.append(r)
+        )
+        sending.start()
+        while sender.counts().get(SENT) != 1:
+            await asyncio.sleep(0.01)
+        await sending.stop()
+
+        owning = OutboxWorker(
+            owner, provider=_Failing(), on_result=lambda *r: owner_results.append(r)
+        )
+        owning.start()
+        await asyncio.sleep(0.05)
+        await owning.stop()
+        return owner_results, sender_results
+
+    owner_results, sender_results = asyncio.run(run())
+    assert sender_results == []
+    assert len(owner_results) == 1
+    lead_id, status, message_id = owner_results[0]
+    assert (lead_id, status) == ("lead-owned", SENT)
+    assert message_id.startswith("wamid.")
+    # Handed out once only
+    assert owner.take_results(10) == []
+
+
+def test_final_failure_is_reported(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"))
+    outbox.enqueue("lead-1", {"template": "t"})
+
+    async def run():
+        results = []
+        worker = OutboxWorker(outbox, provider=_Failing(), on_result=lambda *r: results.append(r))
+        worker.start()
+        while outbox.counts().get(FAILED) != 1:
+            await asyncio.sleep(0.01)
+        await worker.stop()
+        return results
+
+    assert asyncio.run(run()) == [("lead-1", FAILED, None)]